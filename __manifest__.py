@@ -15,15 +15,21 @@ Long description of module's purpose
     # Check https://github.com/odoo/odoo/blob/15.0/odoo/addons/base/data/ir_module_category_data.xml
     # for the full list
     'category': 'sale',
-    'version': '0.1',
+    'version': '0.2',
     'license': 'LGPL-3',
 
     # any module necessary for this one to work correctly
-    'depends': ['base', 'sale', 'stock', 'purchase','account','product'],
+    'depends': ['base', 'bus', 'sale', 'stock', 'purchase','account','product'],
+
+    # psutil: memoria de las corridas de reportes (gd.report.run)
+    'external_dependencies': {'python': ['psutil']},
 
     # always loaded
     'data': [
-        # 'security/ir.model.access.csv',
+        'security/ir.model.access.csv',
+        'security/gd_report_job_security.xml',
+        'data/ir_cron.xml',
+        'data/gd_stock_move_rule_data.xml',
         'views/sale_menus.xml',
         'reports/purchase_order_report_inherit.xml',
         'reports/report_action.xml',
@@ -38,6 +44,10 @@ Long description of module's purpose
         "wizards/gd_resumen_inventario_views.xml",
         "wizards/gd_stock_por_img_views.xml",
         'views/sale_order_views.xml',
+        'views/gd_stock_move_rule_views.xml',
+        'views/gd_report_job_views.xml',
+        'views/gd_report_diagnostic_views.xml',
+        'views/gd_report_run_views.xml',
         "views/gd_reportes_ventas_menus.xml",
     ],
     # only loaded in demonstration mode
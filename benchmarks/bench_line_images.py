@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: creación masiva de líneas con y sin imagen diferida.
+
+Uso (no modifica la base, todo se revierte):
+
+    odoo-bin shell -d <db> --no-http < benchmarks/bench_line_images.py
+
+Variables de entorno opcionales: GD_BENCH_LINES (2000), GD_BENCH_PRODUCTS (200).
+"""
+import os
+import time
+
+N_LINES = int(os.environ.get("GD_BENCH_LINES", 2000))
+N_PRODUCTS = int(os.environ.get("GD_BENCH_PRODUCTS", 200))
+
+ICP = env["ir.config_parameter"].sudo()  # noqa: F821 (env lo inyecta odoo-bin shell)
+
+products = env["product.product"].search([  # noqa: F821
+    ("sale_ok", "=", True),
+    ("product_tmpl_id.image_1920", "!=", False),
+], limit=N_PRODUCTS)
+partner = env["res.partner"].search([("customer_rank", ">", 0)], limit=1) or env.user.partner_id  # noqa: F821
+
+if not products:
+    raise SystemExit("No hay productos con imagen para el benchmark.")
+
+
+def _run(label, mode, context):
+    with env.cr.savepoint(flush=False) as sp:  # noqa: F821
+        ICP.set_param("grupodirecto.line_image_mode", mode)
+        lines = [
+            (0, 0, {"product_id": products[i % len(products)].id, "product_uom_qty": 1})
+            for i in range(N_LINES)
+        ]
+        start = time.perf_counter()
+        env["sale.order"].with_context(**context).create({  # noqa: F821
+            "partner_id": partner.id,
+            "order_line": lines,
+        })
+        env.flush_all()  # noqa: F821
+        elapsed = time.perf_counter() - start
+        sp.rollback()
+    env.invalidate_all()  # noqa: F821
+    env.registry.clear_cache()  # noqa: F821 (caché de ir.config_parameter)
+    print(f"{label:<28} {N_LINES:>6} líneas  {elapsed:8.2f}s  {N_LINES / elapsed:10.1f} líneas/s")
+
+
+print(f"Productos distintos: {len(products)}")
+_run("copy (inmediato)", "copy", {})
+_run("copy (diferido)", "copy", {"gd_defer_line_images": True})
+_run("reference", "reference", {})
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: tamaño del HTML y tiempo de render de la "Cotización Bazzar".
+
+Compara los bytes base64 que se incrustarían con ``image_1920`` contra la
+miniatura ``gd_report_image`` y mide el render HTML de las cotizaciones con
+más líneas por los dos caminos: el anterior (la plantilla se cambia
+temporalmente a ``image_1920`` dentro de un savepoint que se revierte) y el
+actual.
+
+    odoo-bin shell -d <db> --no-http < benchmarks/bench_report_images.py
+
+Variables de entorno opcionales: GD_BENCH_ORDERS (5), GD_BENCH_REPEAT (3).
+"""
+import os
+import time
+
+N_ORDERS = int(os.environ.get("GD_BENCH_ORDERS", 5))
+REPEAT = int(os.environ.get("GD_BENCH_REPEAT", 3))
+REPORT = "grupodirecto.sale_order_custom_report_pdf"
+
+env.cr.execute("""
+    SELECT order_id FROM sale_order_line
+     GROUP BY order_id ORDER BY COUNT(*) DESC LIMIT %s
+""", [N_ORDERS])  # noqa: F821 (env lo inyecta odoo-bin shell)
+order_ids = [r[0] for r in env.cr.fetchall()]  # noqa: F821
+orders = env["sale.order"].browse(order_ids)  # noqa: F821
+lines = orders.order_line.filtered("product_id")
+
+old_bytes = sum(len(l.product_id.image_1920 or b"") for l in lines)
+new_bytes = sum(len(l.product_id.gd_report_image or b"") for l in lines)
+print(f"Órdenes: {len(orders)}  líneas: {len(lines)}")
+print(f"Imágenes incrustadas image_1920:      {old_bytes / 1e6:10.2f} MB")
+print(f"Imágenes incrustadas gd_report_image: {new_bytes / 1e6:10.2f} MB")
+
+
+def _render(label):
+    best = None
+    for _i in range(REPEAT):
+        env.invalidate_all()  # noqa: F821 (lectura en frío de las imágenes)
+        start = time.perf_counter()
+        html, _fmt = env["ir.actions.report"]._render_qweb_html(REPORT, orders.ids)  # noqa: F821
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"Render {label:<16} HTML {len(html) / 1e6:10.2f} MB en {best:6.2f}s (mejor de {REPEAT})")
+
+
+# Camino anterior: la misma plantilla incrustando image_1920
+views = env["ir.ui.view"].search([  # noqa: F821
+    ("type", "=", "qweb"),
+    ("arch_db", "ilike", "line.product_id.gd_report_image"),
+])
+if views:
+    with env.cr.savepoint() as sp:  # noqa: F821
+        for view in views:
+            view.arch = view.arch.replace("line.product_id.gd_report_image", "line.product_id.image_1920")
+        _render("image_1920")
+        sp.rollback()
+    env.registry.clear_cache("templates")  # noqa: F821
+    env.invalidate_all()  # noqa: F821
+else:
+    print("No se encontró la plantilla con gd_report_image; se omite el camino anterior.")
+
+_render("gd_report_image")
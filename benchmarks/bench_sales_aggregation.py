@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: ventas netas por producto, read_group doble vs una pasada SQL.
+
+Compara el camino anterior (un read_group para out_invoice, otro para
+out_refund y neteo en Python, por periodo) con ``gd.sales.aggregator``
+(una consulta para todos los periodos, sobre apuntes y sobre la tabla
+diaria) y verifica que den lo mismo.
+
+    GD_BENCH_SUPPLIER=<partner_id> odoo-bin shell -d <db> --no-http < benchmarks/bench_sales_aggregation.py
+
+Variables de entorno: GD_BENCH_SUPPLIER (obligatoria), GD_BENCH_COMPANY,
+GD_BENCH_FROM / GD_BENCH_TO (rango actual, AAAA-MM-DD; el de comparación es
+el mismo rango un año antes), GD_BENCH_REPEAT (3).
+"""
+import os
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+supplier_id = int(os.environ["GD_BENCH_SUPPLIER"])
+company_id = int(os.environ.get("GD_BENCH_COMPANY") or env.company.id)  # noqa: F821 (env lo inyecta odoo-bin shell)
+date_to = date.fromisoformat(os.environ.get("GD_BENCH_TO") or date.today().isoformat())
+date_from = date.fromisoformat(os.environ.get("GD_BENCH_FROM") or (date_to - relativedelta(years=1)).isoformat())
+repeat = int(os.environ.get("GD_BENCH_REPEAT", 3))
+periods = [(date_from, date_to), (date_from - relativedelta(years=1), date_to - relativedelta(years=1))]
+
+product_ids = env["gd.supplier.product.resolver"]._get_product_ids(company_id, supplier_id)  # noqa: F821
+aml = env["account.move.line"].sudo()  # noqa: F821
+
+
+def legacy(date_from, date_to):
+    base = [
+        ("product_id", "in", product_ids),
+        ("display_type", "=", "product"),
+        ("move_id.company_id", "=", company_id),
+        ("move_id.state", "=", "posted"),
+        ("move_id.date", ">=", date_from),
+        ("move_id.date", "<=", date_to),
+    ]
+    res = {}
+    for move_type, sign in (("out_invoice", 1), ("out_refund", -1)):
+        for g in aml.read_group(base + [("move_id.move_type", "=", move_type)],
+                                ["product_id", "quantity:sum", "price_subtotal:sum"],
+                                ["product_id"], lazy=False):
+            qty, amt = res.get(g["product_id"][0], (0.0, 0.0))
+            res[g["product_id"][0]] = (qty + sign * (g["quantity"] or 0.0),
+                                       amt + sign * (g["price_subtotal"] or 0.0))
+    return res
+
+
+def timed(fn):
+    best = None
+    for _i in range(repeat):
+        env.invalidate_all()  # noqa: F821
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+env.cr.execute("SELECT COUNT(*) FROM account_move_line")  # noqa: F821
+print(f"account_move_line: {env.cr.fetchone()[0]} filas; productos del proveedor: {len(product_ids)}")  # noqa: F821
+
+t_old, old = timed(lambda: [legacy(*p) for p in periods])
+t_new, new = timed(lambda: env["gd.sales.aggregator"]._get_net_sales_live(company_id, product_ids, periods))  # noqa: F821
+t_daily, daily = timed(lambda: env["gd.sales.aggregator"]._get_net_sales(company_id, product_ids, periods))  # noqa: F821
+
+mismatch = 0
+for idx, per_period in enumerate(old):
+    for pid, (qty, amt) in per_period.items():
+        values = new.get(pid, (0.0,) * 2 * len(periods))
+        if abs(values[2 * idx] - qty) > 1e-6 or abs(values[2 * idx + 1] - amt) > 1e-6:
+            mismatch += 1
+
+print(f"read_group x4 + neteo Python: {t_old:8.3f}s")
+print(f"account_move_line (1 query):   {t_new:8.3f}s  ({t_old / t_new if t_new else 0:.1f}x)")
+print(f"gd_sales_daily (1 query):      {t_daily:8.3f}s  ({t_old / t_daily if t_daily else 0:.1f}x)")
+daily_mismatch = sum(
+    1 for pid in set(new) | set(daily)
+    if any(abs(a - b) > 1e-6 for a, b in zip(new.get(pid, (0.0,) * 4), daily.get(pid, (0.0,) * 4)))
+)
+print(f"Diferencias: {mismatch}  (tabla diaria vs apuntes: {daily_mismatch})")
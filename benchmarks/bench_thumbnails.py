@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Benchmark: generación de miniaturas en serie, pool de hilos y pool de procesos.
+
+Uso (solo lee la base):
+
+    odoo-bin shell -d <db> --no-http < benchmarks/bench_thumbnails.py
+
+Variables de entorno opcionales: GD_BENCH_IMAGES (500), GD_BENCH_WORKERS (4),
+GD_BENCH_PX (70).
+"""
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+N_IMAGES = int(os.environ.get("GD_BENCH_IMAGES", 500))
+WORKERS = int(os.environ.get("GD_BENCH_WORKERS", 4))
+MAX_PX = int(os.environ.get("GD_BENCH_PX", 70))
+
+Thumbnail = env["gd.image.thumbnail"]  # noqa: F821 (env lo inyecta odoo-bin shell)
+make_thumbnail = importlib.import_module(
+    f"odoo.addons.{Thumbnail._original_module}.models.gd_image_thumbnail"
+).make_thumbnail
+products = env["product.product"].search([("product_tmpl_id.image_1920", "!=", False)], limit=N_IMAGES)  # noqa: F821
+checksums = sorted({c for c in Thumbnail._get_product_image_checksums(products).values() if c})
+sources = Thumbnail._get_image_sources(checksums)
+# Lectura fuera de la medición: solo se compara la generación
+raws = [Thumbnail._read_image_source(sources[c]) for c in checksums if c in sources]
+if not raws:
+    raise SystemExit("No hay productos con imagen para el benchmark.")
+
+
+def _run(label, run):
+    start = time.perf_counter()
+    done = sum(1 for thumb in run() if thumb)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {done:>6} miniaturas  {elapsed:8.2f}s  {done / elapsed:10.1f} img/s")
+
+
+def _serial():
+    return [make_thumbnail(raw, MAX_PX) for raw in raws]
+
+
+def _pooled(executor_cls):
+    def run():
+        with executor_cls(max_workers=WORKERS) as executor:
+            return list(executor.map(make_thumbnail, raws, [MAX_PX] * len(raws)))
+    return run
+
+
+print(f"Imágenes distintas: {len(raws)}  workers: {WORKERS}  CPUs: {os.cpu_count()}")
+_run("serie", _serial)
+_run("pool de hilos", _pooled(ThreadPoolExecutor))
+_run("pool de procesos", _pooled(ProcessPoolExecutor))
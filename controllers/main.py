@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+
+
+class GdReportController(http.Controller):
+
+    @http.route("/grupodirecto/report/<int:attachment_id>", type="http", auth="user")
+    def gd_report_download(self, attachment_id, **kwargs):
+        """Descarga de un Excel generado por los wizards GD.
+
+        Sirve el archivo del filestore tal cual (sin base64): ir.binary arma la
+        respuesta con Content-Length, ETag (checksum) y soporte de Range; el
+        contenido de un adjunto no cambia, así que se marca como inmutable.
+        """
+        attachment = request.env["ir.attachment"].sudo().browse(attachment_id).exists()
+        report_models = request.env["gd.report.wizard.mixin"]._gd_report_models()
+        if not attachment or attachment.res_model not in report_models or attachment.res_field:
+            raise request.not_found()
+
+        # Los resultados en caché se comparten: basta con poder correr ese
+        # reporte en la compañía del archivo
+        request.env[attachment.res_model].check_access("create")
+        if attachment.company_id and attachment.company_id not in request.env.user.company_ids:
+            raise request.not_found()
+
+        stream = request.env["ir.binary"]._get_stream_from(attachment)
+        return stream.get_response(as_attachment=True, immutable=True)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """0.2: product_image en líneas pasa a ser referencia a la imagen del producto.
+
+    Colapsa las copias guardadas por línea y reporta los bytes recuperados.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    stats = [
+        env["sale.order.line"]._gd_collapse_line_image_copies(("product_template", "product_id")),
+        env["purchase.order.line"]._gd_collapse_line_image_copies(("product_product", "product_id")),
+    ]
+    _logger.info(
+        "[GD_IMG] Migración 0.2: %s copias eliminadas, %s conservadas como snapshot, %s bytes recuperados",
+        sum(s["removed"] for s in stats),
+        sum(s["kept_as_snapshot"] for s in stats),
+        sum(s["bytes_reclaimed"] for s in stats),
+    )
@@ -1,6 +1,26 @@
 # -*- coding: utf-8 -*-
 
+from . import account_move
+from . import gd_image_thumbnail
+from . import gd_line_image_mixin
+from . import gd_report_cache
+from . import gd_report_diagnostic
+from . import gd_report_job
+from . import gd_report_run
+from . import gd_sales_aggregator
+from . import gd_sales_closed_period
+from . import gd_sales_daily
+from . import gd_stock_move_rule
+from . import gd_stock_snapshot
+from . import gd_supplier_product
+from . import gd_supplier_product_resolver
+from . import ir_actions_report
 from . import product_template
+from . import product_product
+from . import product_supplierinfo
+from . import purchase_order
 from . import purchase_order_line
+from . import res_company
+from . import res_partner
 from . import sale_order_line
 from . import sale_order
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        self.env['gd.sales.daily']._gd_refresh_moves(posted)
+        return posted
+
+    def button_draft(self):
+        res = super().button_draft()
+        self.env['gd.sales.daily']._gd_refresh_moves(self)
+        return res
+
+    def button_cancel(self):
+        res = super().button_cancel()
+        self.env['gd.sales.daily']._gd_refresh_moves(self)
+        return res
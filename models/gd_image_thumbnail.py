@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import api, models
+from odoo.tools.lru import LRU
+
+_logger = logging.getLogger(__name__)
+
+IMAGE_WORKERS_PARAM = "grupodirecto.image_workers"
+
+# Caché en memoria del proceso: (checksum, max_px) -> (png_bytes, width, height)
+_THUMBNAIL_LRU = LRU(4096)
+
+
+def make_thumbnail(raw, max_px):
+    """Normaliza a PNG y reduce a ``max_px``. Retorna (bytes, width, height),
+    o None si Pillow no puede leer la imagen."""
+    try:
+        from PIL import Image  # pillow (normalmente ya viene por Odoo)
+
+        im = Image.open(io.BytesIO(raw))
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        im.thumbnail((max_px, max_px))
+        bio = io.BytesIO()
+        im.save(bio, format="PNG")
+        w, h = im.size
+        return bio.getvalue(), w, h
+    except Exception:
+        # Sin miniatura (y sin guardarla): la próxima corrida lo vuelve a intentar
+        _logger.warning("[GD_IMG] no se pudo generar la miniatura de una imagen", exc_info=True)
+        return None
+
+
+class GdImageThumbnail(models.AbstractModel):
+    """Miniaturas de imágenes de producto para los Excel, por checksum y tamaño.
+
+    Se buscan en una LRU del proceso, luego en adjuntos guardados
+    (``res_model = gd.image.thumbnail``) y solo las que faltan se generan con
+    Pillow. Las variantes que comparten la imagen de la plantilla comparten
+    checksum y por lo tanto miniatura. Las miniaturas cuya imagen de origen ya
+    no existe se borran en ``_gd_cron_gc_thumbnails``.
+    """
+
+    _name = "gd.image.thumbnail"
+    _description = "GD - Miniaturas de imágenes de producto"
+
+    @api.model
+    def _get_product_image_checksums(self, products):
+        """Dict product_id -> checksum de la imagen 256 (variante o plantilla), sin leer las imágenes."""
+        if not products:
+            return {}
+        self.env.cr.execute("""
+            SELECT pp.id, COALESCE(va.checksum, ta.checksum)
+              FROM product_product pp
+         LEFT JOIN ir_attachment va
+                ON va.res_model = 'product.product'
+               AND va.res_field = 'image_variant_256'
+               AND va.res_id = pp.id
+         LEFT JOIN ir_attachment ta
+                ON ta.res_model = 'product.template'
+               AND ta.res_field = 'image_256'
+               AND ta.res_id = pp.product_tmpl_id
+             WHERE pp.id = ANY(%s)
+        """, [products.ids])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _thumbnail_name(self, checksum, max_px):
+        return f"gd_thumb_{checksum}_{max_px}.png"
+
+    @api.model
+    def _get_stored_thumbnails(self, checksums, max_px):
+        """Checksum -> (bytes, w, h) para los que ya están en la LRU o en adjuntos."""
+        thumbs = {}
+        missing = []
+        for checksum in checksums:
+            if (checksum, max_px) in _THUMBNAIL_LRU:
+                thumbs[checksum] = _THUMBNAIL_LRU[(checksum, max_px)]
+            else:
+                missing.append(checksum)
+
+        # Adjuntos guardados en corridas anteriores (de cualquier worker)
+        if missing:
+            names = {self._thumbnail_name(c, max_px): c for c in missing}
+            for att in self.env["ir.attachment"].sudo().search_read(
+                [("res_model", "=", self._name), ("name", "in", list(names))],
+                ["name", "raw", "description"],
+            ):
+                checksum = names[att["name"]]
+                w, _x, h = (att["description"] or f"{max_px}x{max_px}").partition("x")
+                thumbs[checksum] = _THUMBNAIL_LRU[(checksum, max_px)] = (att["raw"], int(w), int(h))
+        return thumbs
+
+    @api.model
+    def _get_image_sources(self, checksums):
+        """Checksum -> (store_fname, db_datas) de un adjunto con esa imagen."""
+        if not checksums:
+            return {}
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (checksum) checksum, store_fname, db_datas
+              FROM ir_attachment
+             WHERE checksum = ANY(%s)
+        """, [list(checksums)])
+        return {checksum: (fname, db_datas) for checksum, fname, db_datas in self.env.cr.fetchall()}
+
+    @api.model
+    def _read_image_source(self, source):
+        fname, db_datas = source
+        if fname:
+            return self.env["ir.attachment"]._file_read(fname)
+        return bytes(db_datas or b"")
+
+    @api.model
+    def _get_worker_count(self):
+        default = min(4, os.cpu_count() or 1)
+        return max(1, int(self.env["ir.config_parameter"].sudo().get_param(IMAGE_WORKERS_PARAM, default)))
+
+    @api.model
+    def _iter_product_thumbnails(self, products, max_px=70):
+        """Genera (producto, (png_bytes, w, h) o None) en el orden de ``products``.
+
+        Las miniaturas que faltan se generan en un pool de hilos (Pillow
+        libera el GIL al decodificar, reducir y codificar) que va por delante
+        del consumidor con una ventana acotada (workers x 4 imágenes
+        pendientes); el consumidor (p. ej. el loop de xlsxwriter) recibe los
+        productos en orden. Las generadas se guardan aunque el consumidor se
+        detenga antes de terminar.
+        """
+        checksums = self._get_product_image_checksums(products)
+        distinct = {c for c in checksums.values() if c}
+        thumbs = self._get_stored_thumbnails(distinct, max_px)
+        missing = distinct - set(thumbs)
+        sources = self._get_image_sources(missing)
+        workers = self._get_worker_count() if len(missing) > 1 else 1
+
+        _logger.info(
+            "[GD_IMG] miniaturas %spx: %s productos, %s imágenes distintas, %s a generar (workers=%s)",
+            max_px, len(products), len(distinct), len(missing), workers,
+        )
+
+        generated = {}
+        submitted = {}
+        pending = deque()
+        executor = None
+        if workers > 1:
+            # los hilos solo ejecutan make_thumbnail (sin ORM ni cursor)
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gd_thumb")
+        window = workers * 4
+
+        def _submit(checksum):
+            raw = self._read_image_source(sources[checksum])
+            if executor:
+                submitted[checksum] = executor.submit(make_thumbnail, raw, max_px)
+            else:
+                generated[checksum] = make_thumbnail(raw, max_px)
+
+        def _resolve(checksum):
+            if not checksum:
+                return None
+            if checksum in thumbs:
+                return thumbs[checksum]
+            if checksum in submitted:
+                generated[checksum] = submitted.pop(checksum).result()
+            return generated.get(checksum)
+
+        try:
+            for product in products:
+                checksum = checksums.get(product.id)
+                if checksum in sources and checksum not in submitted and checksum not in generated:
+                    _submit(checksum)
+                pending.append((product, checksum))
+                while len(pending) > window:
+                    product_done, checksum_done = pending.popleft()
+                    yield product_done, _resolve(checksum_done)
+            while pending:
+                product_done, checksum_done = pending.popleft()
+                yield product_done, _resolve(checksum_done)
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            # las que ya terminaron y no se llegaron a entregar también sirven
+            for checksum, future in submitted.items():
+                if future.done() and not future.cancelled() and not future.exception():
+                    generated[checksum] = future.result()
+            try:
+                with self.env.cr.savepoint():
+                    self._store_thumbnails(generated, max_px)
+            except Exception:
+                # p. ej. la transacción ya falló: se regeneran en la próxima corrida
+                _logger.warning("[GD_IMG] no se pudieron guardar %s miniaturas", len(generated), exc_info=True)
+
+    @api.model
+    def _get_product_thumbnails(self, products, max_px=70):
+        """Dict product_id -> (png_bytes, width, height) o None si no tiene imagen."""
+        return {product.id: thumb for product, thumb in self._iter_product_thumbnails(products, max_px)}
+
+    @api.model
+    def _store_thumbnails(self, thumbs, max_px):
+        thumbs = {checksum: thumb for checksum, thumb in thumbs.items() if thumb}
+        if not thumbs:
+            return
+        self.env["ir.attachment"].sudo().create([
+            {
+                "name": self._thumbnail_name(checksum, max_px),
+                "res_model": self._name,
+                "raw": data,
+                "description": f"{w}x{h}",
+                "mimetype": "image/png",
+            }
+            for checksum, (data, w, h) in thumbs.items()
+        ])
+        for checksum, thumb in thumbs.items():
+            _THUMBNAIL_LRU[(checksum, max_px)] = thumb
+
+    # -------------------------
+    # Limpieza
+    # -------------------------
+    @api.model
+    def _gd_cron_gc_thumbnails(self):
+        """Borra las miniaturas cuya imagen de origen (checksum) ya no está en ningún producto."""
+        self.env.cr.execute("""
+            SELECT t.id
+              FROM ir_attachment t
+             WHERE t.res_model = %s
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM ir_attachment s
+                     WHERE s.checksum = substring(t.name from '^gd_thumb_(.+)_[0-9]+\\.png$')
+                       AND s.res_model IN ('product.product', 'product.template')
+               )
+        """, [self._name])
+        orphan_ids = [r[0] for r in self.env.cr.fetchall()]
+        if orphan_ids:
+            _logger.info("[GD_IMG] borrando %s miniaturas sin imagen de origen", len(orphan_ids))
+            self.env["ir.attachment"].sudo().browse(orphan_ids).unlink()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, models
+from odoo.tools import config, split_every
+
+_logger = logging.getLogger(__name__)
+
+LINE_IMAGE_MODE_PARAM = "grupodirecto.line_image_mode"
+LINE_IMAGE_BATCH_PARAM = "grupodirecto.line_image_batch_size"
+
+
+class GdLineImageMixin(models.AbstractModel):
+    """Lógica compartida de imágenes en líneas de venta/compra.
+
+    Modos (parámetro de sistema ``grupodirecto.line_image_mode``):
+
+    - ``reference`` (por defecto): la línea no guarda copia; ``product_image``
+      lee la imagen 1024px que ya tiene el producto (un solo adjunto por
+      checksum en el filestore).
+    - ``copy``: comportamiento anterior, cada línea guarda su propia copia en
+      ``product_image_snapshot``.
+
+    En modo ``copy``, con el contexto ``gd_defer_line_images`` (o durante una
+    importación) la copia no se calcula al crear: la línea queda marcada en
+    ``product_image_pending`` y el cron la llena después por lotes.
+    """
+
+    _name = "gd.line.image.mixin"
+    _description = "GD - Imagen de producto en líneas"
+
+    # Campo (product.product / product.template) del que sale la imagen; lo define cada modelo
+    _gd_image_source_field = "product_id"
+
+    @api.model
+    def _gd_line_image_mode(self):
+        mode = self.env["ir.config_parameter"].sudo().get_param(LINE_IMAGE_MODE_PARAM, "reference")
+        return mode if mode in ("reference", "copy") else "reference"
+
+    @api.model
+    def _gd_defer_line_images(self):
+        ctx = self.env.context
+        return bool(ctx.get("gd_defer_line_images") or ctx.get("import_file"))
+
+    @api.model
+    def _gd_trigger_line_image_cron(self):
+        cron = self.env.ref("grupodirecto.ir_cron_gd_fill_line_images", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if self._gd_line_image_mode() != "copy" or not self._gd_defer_line_images():
+            return super().create(vals_list)
+        # Valores explícitos: el ORM no ejecuta el compute de la copia al crear
+        for vals in vals_list:
+            vals.setdefault("product_image_snapshot", False)
+            vals.setdefault("product_image_pending", True)
+        lines = super().create(vals_list)
+        self._gd_trigger_line_image_cron()
+        return lines
+
+    # -------------------------
+    # Llenado diferido (cron)
+    # -------------------------
+    def _gd_fill_line_images(self):
+        """Llena ``product_image_snapshot`` de las líneas recibidas.
+
+        Las líneas se agrupan por producto de origen: la imagen se lee y se
+        redimensiona una sola vez por producto y se escribe en todas sus líneas.
+        """
+        source_field = self._gd_image_source_field
+        by_source = {}
+        for line in self:
+            by_source.setdefault(line[source_field], self.browse())
+            by_source[line[source_field]] |= line
+
+        for source, lines in by_source.items():
+            lines.write({
+                "product_image_snapshot": source.image_1920 or False,
+                "product_image_pending": False,
+            })
+        return len(self)
+
+    @api.model
+    def _gd_cron_fill_line_images(self, limit=None):
+        """Procesa las líneas pendientes en lotes con commit entre lotes."""
+        if limit is None:
+            limit = int(self.env["ir.config_parameter"].sudo().get_param(LINE_IMAGE_BATCH_PARAM, 500))
+        pending = self.sudo().search([("product_image_pending", "=", True)], limit=limit * 10)
+        if not pending:
+            return 0
+
+        if self._gd_line_image_mode() != "copy":
+            # Se cambió a modo referencia: ya no hace falta copiar nada
+            pending.write({"product_image_pending": False})
+            return 0
+
+        auto_commit = not config["test_enable"]
+        done = 0
+        for ids in split_every(limit, pending.ids):
+            done += self.sudo().browse(ids)._gd_fill_line_images()
+            if auto_commit:
+                self.env.cr.commit()
+
+        _logger.info("[GD_IMG] %s: %s líneas con imagen llenada en segundo plano", self._name, done)
+        if self.sudo().search_count([("product_image_pending", "=", True)], limit=1):
+            self._gd_trigger_line_image_cron()
+        return done
+
+    # -------------------------
+    # Migración 0.2
+    # -------------------------
+    @api.model
+    def _gd_collapse_line_image_copies(self, source_field):
+        """Colapsa las copias por línea del antiguo campo ``product_image``.
+
+        - Si la copia es idéntica (checksum) a la imagen 1024 actual del producto,
+          se elimina: la línea ya la obtiene por referencia.
+        - Si es distinta (el producto cambió de imagen después), se conserva como
+          ``product_image_snapshot`` para no alterar documentos históricos.
+
+        ``source_field`` indica de dónde se copió la imagen en la línea:
+        ``('product_template', 'product_id')`` (imagen de la plantilla) o
+        ``('product_product', 'product_id')`` (imagen de la variante, que cae a
+        la de la plantilla si no tiene propia, igual que ``image_1920``).
+        En variantes ``image_1024`` no se guarda: el adjunto es
+        ``image_variant_1024``.
+        Retorna dict con contadores y bytes recuperados.
+        """
+        cr = self.env.cr
+        table = self._table
+        res_model = self._name
+        src_model, src_column = source_field
+
+        if src_model == "product_product":
+            variant_join = """
+         LEFT JOIN ir_attachment va
+                ON va.res_model = 'product.product'
+               AND va.res_field = 'image_variant_1024'
+               AND va.res_id = pp.id"""
+            product_checksum = "COALESCE(va.checksum, ta.checksum)"
+        else:
+            variant_join = ""
+            product_checksum = "ta.checksum"
+
+        cr.execute(f"""
+            SELECT a.id,
+                   a.store_fname,
+                   COALESCE(a.file_size, 0),
+                   (a.checksum IS NOT DISTINCT FROM {product_checksum}) AS duplicated
+              FROM ir_attachment a
+              JOIN {table} l ON l.id = a.res_id
+         LEFT JOIN product_product pp ON pp.id = l.{src_column}{variant_join}
+         LEFT JOIN ir_attachment ta
+                ON ta.res_model = 'product.template'
+               AND ta.res_field = 'image_1024'
+               AND ta.res_id = pp.product_tmpl_id
+             WHERE a.res_model = %s
+               AND a.res_field = 'product_image'
+        """, [res_model])
+        rows = cr.fetchall()
+
+        duplicated_ids = [r[0] for r in rows if r[3]]
+        kept_ids = [r[0] for r in rows if not r[3]]
+
+        # Bytes recuperados: solo archivos que ningún otro adjunto sigue usando
+        reclaimed = 0
+        if duplicated_ids:
+            cr.execute("""
+                SELECT COALESCE(SUM(s.file_size), 0)
+                  FROM (
+                        SELECT DISTINCT a.store_fname, a.file_size
+                          FROM ir_attachment a
+                         WHERE a.id IN %s
+                           AND a.store_fname IS NOT NULL
+                           AND NOT EXISTS (
+                                SELECT 1 FROM ir_attachment o
+                                 WHERE o.store_fname = a.store_fname
+                                   AND o.id NOT IN %s
+                           )
+                       ) s
+            """, [tuple(duplicated_ids), tuple(duplicated_ids)])
+            reclaimed = cr.fetchone()[0] or 0
+
+            self.env["ir.attachment"].sudo().browse(duplicated_ids).unlink()
+
+        if kept_ids:
+            cr.execute("""
+                UPDATE ir_attachment
+                   SET res_field = 'product_image_snapshot'
+                 WHERE id IN %s
+            """, [tuple(kept_ids)])
+
+        stats = {
+            "model": res_model,
+            "removed": len(duplicated_ids),
+            "kept_as_snapshot": len(kept_ids),
+            "bytes_reclaimed": int(reclaimed),
+        }
+        _logger.info(
+            "[GD_IMG] %s: copias eliminadas=%s conservadas=%s bytes recuperados=%s",
+            res_model, stats["removed"], stats["kept_as_snapshot"], stats["bytes_reclaimed"],
+        )
+        return stats
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Vigencia máxima de un resultado en caché (horas); 0 = caché desactivada
+REPORT_CACHE_MAX_AGE_PARAM = "grupodirecto.report_cache_max_age_hours"
+REPORT_CACHE_MAX_AGE_DEFAULT = 24
+# Tamaño total máximo de los archivos en caché (MB)
+REPORT_CACHE_MAX_MB_PARAM = "grupodirecto.report_cache_max_mb"
+REPORT_CACHE_MAX_MB_DEFAULT = 512
+
+# Tablas usadas en la marca de agua: (product_id, write_date) indexado para
+# leer el último cambio por producto con un solo salto de índice
+GD_WATERMARK_TABLES = ("account_move_line", "stock_move_line", "stock_quant")
+
+
+class GdReportCache(models.Model):
+    """Resultados de reportes Excel ya generados.
+
+    La clave sale del tipo de reporte y sus parámetros (compañía, proveedor,
+    fechas, opciones); la marca de agua, de la última modificación de los datos
+    que lee el reporte. Si ambas coinciden se devuelve el adjunto guardado.
+    """
+
+    _name = "gd.report.cache"
+    _description = "GD - Caché de resultados de reportes"
+    _order = "id desc"
+
+    key = fields.Char(string="Clave", required=True, index=True)
+    watermark = fields.Char(string="Marca de agua", required=True)
+    report_model = fields.Char(string="Modelo del reporte", required=True)
+    company_id = fields.Many2one("res.company", string="Compañía")
+    attachment_id = fields.Many2one("ir.attachment", string="Archivo", required=True, ondelete="cascade")
+    file_size = fields.Integer(string="Tamaño", related="attachment_id.file_size")
+    hit_count = fields.Integer(string="Aciertos", default=0)
+    last_hit = fields.Datetime(string="Último acierto")
+
+    def init(self):
+        for table in GD_WATERMARK_TABLES:
+            create_index(
+                self.env.cr, f"{table}_gd_product_write_date_index", table,
+                ["product_id", "write_date"], where="product_id IS NOT NULL",
+            )
+
+    # -------------------------
+    # Parámetros
+    # -------------------------
+    @api.model
+    def _gd_get_int_param(self, key, default):
+        try:
+            return int(self.env["ir.config_parameter"].sudo().get_param(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    @api.model
+    def _gd_key(self, report_model, params):
+        payload = json.dumps({"model": report_model, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @api.model
+    def _gd_product_watermark(self, table, product_ids):
+        """Último write_date de ``table`` para los productos (LATERAL + índice)."""
+        if table not in GD_WATERMARK_TABLES or not product_ids:
+            return ""
+        self.env.cr.execute(f"""
+            SELECT max(last.write_date)
+              FROM unnest(%s) AS p(id),
+                   LATERAL (
+                       SELECT t.write_date
+                         FROM {table} t
+                        WHERE t.product_id = p.id
+                        ORDER BY t.write_date DESC
+                        LIMIT 1
+                   ) last
+        """, [list(product_ids)])
+        return str(self.env.cr.fetchone()[0] or "")
+
+    # -------------------------
+    # Lectura / escritura
+    # -------------------------
+    @api.model
+    def _gd_lookup(self, key, watermark):
+        max_age = self._gd_get_int_param(REPORT_CACHE_MAX_AGE_PARAM, REPORT_CACHE_MAX_AGE_DEFAULT)
+        if max_age <= 0:
+            return self.env["ir.attachment"]
+        entry = self.search([
+            ("key", "=", key),
+            ("watermark", "=", watermark),
+            ("create_date", ">=", fields.Datetime.now() - timedelta(hours=max_age)),
+        ], limit=1)
+        if not entry:
+            return self.env["ir.attachment"]
+        entry.write({"hit_count": entry.hit_count + 1, "last_hit": fields.Datetime.now()})
+        return entry.attachment_id
+
+    @api.model
+    def _gd_store(self, key, watermark, report_model, company, attachment):
+        if self._gd_get_int_param(REPORT_CACHE_MAX_AGE_PARAM, REPORT_CACHE_MAX_AGE_DEFAULT) <= 0:
+            return self
+        # Una sola entrada por clave: la anterior quedó con otra marca de agua
+        old = self.search([("key", "=", key)])
+        old_attachments = old.attachment_id - attachment
+        old.unlink()
+        self._gd_unlink_unreferenced(old_attachments)
+        entry = self.create({
+            "key": key,
+            "watermark": watermark,
+            "report_model": report_model,
+            "company_id": company.id,
+            "attachment_id": attachment.id,
+        })
+        self._gd_evict()
+        return entry
+
+    # -------------------------
+    # Expulsión
+    # -------------------------
+    @api.model
+    def _gd_evict(self):
+        """Expulsa por antigüedad y luego, por tamaño total, las menos usadas.
+
+        Se borran las entradas; el archivo solo si ningún wizard ni
+        gd.report.job lo sigue usando (si no, lo borra la retención de
+        ``_gd_cron_gc_report_files``).
+        """
+        max_age = self._gd_get_int_param(REPORT_CACHE_MAX_AGE_PARAM, REPORT_CACHE_MAX_AGE_DEFAULT)
+        max_bytes = self._gd_get_int_param(REPORT_CACHE_MAX_MB_PARAM, REPORT_CACHE_MAX_MB_DEFAULT) * 1024 * 1024
+
+        expired = self.search([("create_date", "<", fields.Datetime.now() - timedelta(hours=max(max_age, 0)))])
+        evict_ids = set(expired.ids)
+
+        self.env.cr.execute("""
+            SELECT c.id, a.file_size
+              FROM gd_report_cache c
+              JOIN ir_attachment a ON a.id = c.attachment_id
+             ORDER BY COALESCE(c.last_hit, c.create_date) DESC, c.id DESC
+        """)
+        total = 0
+        for entry_id, size in self.env.cr.fetchall():
+            if entry_id in evict_ids:
+                continue
+            total += size or 0
+            if total > max_bytes:
+                evict_ids.add(entry_id)
+
+        if evict_ids:
+            _logger.info("[GD_CACHE] expulsando %s reportes de la caché", len(evict_ids))
+            entries = self.browse(evict_ids)
+            attachments = entries.attachment_id
+            entries.unlink()
+            self._gd_unlink_unreferenced(attachments)
+        return len(evict_ids)
+
+    @api.model
+    def _gd_unlink_unreferenced(self, attachments):
+        """Borra los adjuntos que ya no usa ninguna entrada, wizard ni gd.report.job."""
+        if not attachments:
+            return
+        ids = attachments.ids
+        used = self.search([("attachment_id", "in", ids)]).attachment_id
+        used |= self.env["gd.report.job"].sudo().search([("attachment_id", "in", ids)]).attachment_id
+        for model in self.env["gd.report.wizard.mixin"]._gd_report_models():
+            used |= self.env[model].sudo().search([("gd_attachment_id", "in", ids)]).gd_attachment_id
+        (attachments - used).sudo().unlink()
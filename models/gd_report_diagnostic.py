@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import itertools
+import logging
+import re
+import time
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# '1' activa el modo diagnóstico en todas las corridas de reportes
+REPORT_DIAGNOSTICS_PARAM = "grupodirecto.report_diagnostics"
+
+_EXECUTION_TIME_RE = re.compile(r"Execution Time: ([\d.]+) ms")
+
+# Diagnósticos en curso: clave (en el contexto como gd_diagnostic_key) -> valores
+_ACTIVE_DIAGNOSTICS = {}
+_DIAGNOSTIC_KEYS = itertools.count(1)
+
+
+class GdReportDiagnostic(models.Model):
+    """Diagnóstico de una corrida de reporte (modo diagnóstico).
+
+    Guarda cantidad de consultas SQL, duración total y el plan
+    (EXPLAIN ANALYZE) de cada consulta de agregación. Fuera de este modo el
+    reporte no ejecuta ninguna consulta extra.
+    """
+
+    _name = "gd.report.diagnostic"
+    _description = "GD - Diagnóstico de reporte"
+    _order = "id desc"
+
+    name = fields.Char(string="Reporte", required=True)
+    report_model = fields.Char(string="Modelo del reporte", required=True)
+    params = fields.Json(string="Parámetros")
+    user_id = fields.Many2one("res.users", string="Usuario", default=lambda self: self.env.user)
+    company_id = fields.Many2one("res.company", string="Compañía")
+    duration = fields.Float(string="Duración (s)", digits=(16, 3))
+    query_count = fields.Integer(string="Consultas SQL", help="Sin contar las del propio diagnóstico.")
+    overhead_query_count = fields.Integer(string="Consultas del diagnóstico")
+    plan_count = fields.Integer(string="Planes")
+    plans = fields.Text(string="Planes (EXPLAIN ANALYZE)")
+    error = fields.Text(string="Error")
+
+    # -------------------------
+    # Corrida
+    # -------------------------
+    @api.model
+    def _gd_is_enabled(self, wizard):
+        if wizard.gd_diagnostics:
+            return True
+        return self.env["ir.config_parameter"].sudo().get_param(REPORT_DIAGNOSTICS_PARAM) in ("1", "True", "true")
+
+    @api.model
+    def _gd_run(self, wizard, func):
+        """Ejecuta ``func`` (la generación) midiendo consultas y tiempo.
+
+        El diagnóstico se arma en memoria y se guarda al final en un cursor
+        aparte: si el reporte falla, queda registrado con su error.
+        """
+        key = next(_DIAGNOSTIC_KEYS)
+        vals = _ACTIVE_DIAGNOSTICS[key] = {
+            "name": wizard._description,
+            "report_model": wizard._name,
+            "params": wizard._gd_job_params(),
+            "user_id": self.env.uid,
+            "company_id": wizard.company_id.id,
+            "plans": "",
+            "plan_count": 0,
+            "overhead_query_count": 0,
+            "error": False,
+        }
+        cr = self.env.cr
+        start_count = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            return func(wizard.with_context(gd_diagnostic_key=key))
+        except Exception as e:
+            vals["error"] = str(e)
+            raise
+        finally:
+            _ACTIVE_DIAGNOSTICS.pop(key, None)
+            vals["duration"] = time.perf_counter() - start
+            vals["query_count"] = cr.sql_log_count - start_count - vals["overhead_query_count"]
+            self._gd_save(vals)
+
+    @api.model
+    def _gd_save(self, vals):
+        try:
+            with self.env.registry.cursor() as cr:
+                self.with_env(self.env(cr=cr, su=True)).create(vals)
+        except Exception:
+            _logger.exception("[GD_DIAG] no se pudo guardar el diagnóstico de %s", vals.get("report_model"))
+
+    # -------------------------
+    # Planes
+    # -------------------------
+    @api.model
+    def _gd_explain(self, label, query, params):
+        """Si la corrida está en modo diagnóstico, guarda el plan de ``query``.
+
+        Lo llaman las consultas de agregación justo antes de ejecutarse.
+        """
+        vals = _ACTIVE_DIAGNOSTICS.get(self.env.context.get("gd_diagnostic_key"))
+        if vals is None:
+            return
+        cr = self.env.cr
+        start_count = cr.sql_log_count
+        cr.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+        plan = "\n".join(row[0] for row in cr.fetchall())
+        match = _EXECUTION_TIME_RE.search(plan)
+        took = f"{match.group(1)} ms" if match else "?"
+
+        vals["plans"] += f"=== {label} ({took}) ===\n{plan}\n\n"
+        vals["plan_count"] += 1
+        vals["overhead_query_count"] += cr.sql_log_count - start_count
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# Máximo de reportes corriendo a la vez por tipo: grupodirecto.report_job_limit.<modelo>
+REPORT_JOB_LIMIT_PARAM = "grupodirecto.report_job_limit.%s"
+REPORT_JOB_LIMIT_DEFAULT = 1
+# Horas tras las cuales un trabajo "En proceso" se considera caído
+REPORT_JOB_TIMEOUT_PARAM = "grupodirecto.report_job_timeout_hours"
+REPORT_JOB_TIMEOUT_DEFAULT = 3
+
+
+class GdReportJob(models.Model):
+    """Cola de reportes Excel generados en segundo plano.
+
+    El wizard guarda sus parámetros en el trabajo; el cron toma los trabajos en
+    cola (respetando el límite por tipo de reporte), recrea el wizard y lo
+    ejecuta en un cursor propio. Al terminar avisa al usuario por el bus.
+    """
+
+    _name = "gd.report.job"
+    _description = "GD - Reporte en segundo plano"
+    _order = "id desc"
+
+    name = fields.Char(string="Reporte", required=True)
+    report_model = fields.Char(string="Modelo del reporte", required=True, index=True)
+    params = fields.Json(string="Parámetros")
+    user_id = fields.Many2one("res.users", string="Usuario", required=True, default=lambda self: self.env.user)
+    company_id = fields.Many2one("res.company", string="Compañía", required=True, default=lambda self: self.env.company)
+    state = fields.Selection([
+        ("queued", "En cola"),
+        ("running", "En proceso"),
+        ("done", "Listo"),
+        ("failed", "Error"),
+    ], string="Estado", default="queued", required=True, index=True)
+    progress = fields.Float(string="Progreso (%)", readonly=True)
+    progress_msg = fields.Char(string="Etapa", readonly=True)
+    date_started = fields.Datetime(string="Inicio", readonly=True)
+    date_finished = fields.Datetime(string="Fin", readonly=True)
+    attachment_id = fields.Many2one("ir.attachment", string="Archivo", readonly=True, ondelete="set null")
+    error = fields.Text(string="Error", readonly=True)
+
+    # -------------------------
+    # Encolar
+    # -------------------------
+    @api.model
+    def _gd_enqueue(self, wizard):
+        wizard.ensure_one()
+        job = self.sudo().create({
+            "name": wizard._description,
+            "report_model": wizard._name,
+            "params": wizard._gd_job_params(),
+            "user_id": self.env.user.id,
+            "company_id": wizard.company_id.id,
+        })
+        self._gd_trigger_cron()
+        return job
+
+    @api.model
+    def _gd_trigger_cron(self):
+        cron = self.env.ref("grupodirecto.ir_cron_gd_report_jobs", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _gd_job_limit(self, report_model):
+        ICP = self.env["ir.config_parameter"].sudo()
+        try:
+            return int(ICP.get_param(REPORT_JOB_LIMIT_PARAM % report_model, REPORT_JOB_LIMIT_DEFAULT))
+        except (TypeError, ValueError):
+            return REPORT_JOB_LIMIT_DEFAULT
+
+    # -------------------------
+    # Progreso
+    # -------------------------
+    @api.model
+    def _gd_set_progress(self, job_id, progress, message=None):
+        """Actualiza el progreso en un cursor aparte (visible antes del commit del trabajo)."""
+        with self.env.registry.cursor() as cr:
+            cr.execute(
+                "UPDATE gd_report_job SET progress = %s, progress_msg = %s WHERE id = %s",
+                (progress, message, job_id),
+            )
+
+    # -------------------------
+    # Cron
+    # -------------------------
+    @api.model
+    def _gd_cron_run_jobs(self):
+        self._gd_fail_stale_jobs()
+        auto_commit = not config["test_enable"]
+
+        self.env.cr.execute("SELECT DISTINCT report_model FROM gd_report_job WHERE state = 'queued'")
+        report_models = [r[0] for r in self.env.cr.fetchall()]
+
+        job_ids = []
+        for report_model in report_models:
+            free = self._gd_job_limit(report_model) - self.sudo().search_count([
+                ("report_model", "=", report_model),
+                ("state", "=", "running"),
+            ])
+            if free <= 0:
+                continue
+            # SKIP LOCKED: otro worker del cron no toma los mismos trabajos
+            self.env.cr.execute("""
+                UPDATE gd_report_job
+                   SET state = 'running', date_started = (now() at time zone 'UTC'), progress = 0
+                 WHERE id IN (
+                       SELECT id FROM gd_report_job
+                        WHERE state = 'queued' AND report_model = %s
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING id
+            """, (report_model, free))
+            job_ids += [r[0] for r in self.env.cr.fetchall()]
+
+        if auto_commit:
+            self.env.cr.commit()
+        self.invalidate_model()
+
+        for job_id in job_ids:
+            self._gd_run_job(job_id)
+
+        if self.sudo().search_count([("state", "=", "queued")], limit=1):
+            self._gd_trigger_cron()
+
+    @api.model
+    def _gd_run_job(self, job_id):
+        """Ejecuta un trabajo en su propio cursor, con el usuario que lo pidió.
+
+        El cursor del reporte no toca la fila del trabajo: el progreso la
+        actualiza desde otro cursor y, en REPEATABLE READ, escribirla después
+        daría un error de serialización. El estado final se escribe en un
+        cursor nuevo, una vez confirmado el archivo.
+        """
+        job = self.sudo().browse(job_id)
+        user_id, company_id = job.user_id.id, job.company_id.id
+        report_model, params = job.report_model, job.params or {}
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, user_id, {
+                    "allowed_company_ids": [company_id],
+                    "gd_report_job_id": job_id,
+                })
+                wizard = env[report_model].create(params)
+                attachment_id = wizard._gd_get_or_generate().id
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, user_id, {})
+                job_env = env["gd.report.job"].sudo().browse(job_id)
+                job_env.write({
+                    "state": "done",
+                    "progress": 100.0,
+                    "progress_msg": False,
+                    "date_finished": fields.Datetime.now(),
+                    "attachment_id": attachment_id,
+                })
+                job_env._gd_notify_done()
+        except Exception as e:
+            _logger.exception("[GD_JOB] falló el reporte en segundo plano id=%s", job_id)
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, user_id, {})
+                job_env = env["gd.report.job"].sudo().browse(job_id)
+                job_env.write({
+                    "state": "failed",
+                    "date_finished": fields.Datetime.now(),
+                    "error": str(e),
+                })
+                job_env._gd_notify_failed()
+
+    @api.model
+    def _gd_fail_stale_jobs(self):
+        """Marca como fallidos los trabajos que quedaron "En proceso" (worker caído)."""
+        ICP = self.env["ir.config_parameter"].sudo()
+        try:
+            hours = int(ICP.get_param(REPORT_JOB_TIMEOUT_PARAM, REPORT_JOB_TIMEOUT_DEFAULT))
+        except (TypeError, ValueError):
+            hours = REPORT_JOB_TIMEOUT_DEFAULT
+        stale = self.sudo().search([
+            ("state", "=", "running"),
+            ("date_started", "<", fields.Datetime.now() - timedelta(hours=hours)),
+        ])
+        if stale:
+            stale.write({"state": "failed", "error": _("Tiempo de ejecución excedido.")})
+
+    # -------------------------
+    # Avisos
+    # -------------------------
+    def _gd_download_url(self):
+        self.ensure_one()
+        return f"/grupodirecto/report/{self.attachment_id.id}" if self.attachment_id else False
+
+    def _gd_notify_done(self):
+        for job in self:
+            job.user_id._bus_send("simple_notification", {
+                "type": "success",
+                "title": _("Reporte listo"),
+                "message": _("%(name)s: descárguelo en %(url)s", name=job.name, url=job._gd_download_url()),
+                "sticky": True,
+            })
+
+    def _gd_notify_failed(self):
+        for job in self:
+            job.user_id._bus_send("simple_notification", {
+                "type": "danger",
+                "title": _("Error en el reporte"),
+                "message": _("%(name)s: %(error)s", name=job.name, error=job.error or ""),
+                "sticky": True,
+            })
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_url",
+            "url": self._gd_download_url(),
+            "target": "self",
+        }
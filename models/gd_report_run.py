@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import itertools
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+import psutil
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Días que se conservan las corridas registradas; 0 = sin límite
+REPORT_RUN_RETENTION_PARAM = "grupodirecto.report_run_retention_days"
+REPORT_RUN_RETENTION_DEFAULT = 90
+
+# Etapa -> campo de tiempo en gd.report.run
+GD_RUN_STAGES = {
+    "suppliers": "time_suppliers",
+    "aggregation": "time_aggregation",
+    "stock": "time_stock",
+    "images": "time_images",
+    "xlsx": "time_xlsx",
+    "encoding": "time_encoding",
+    "render": "time_render",
+}
+
+# Corridas en curso: clave (en el contexto como gd_report_run_key) -> medidor
+_ACTIVE_RUNS = {}
+_RUN_KEYS = itertools.count(1)
+
+
+def _rss_kb():
+    return psutil.Process().memory_info().rss // 1024
+
+
+class _RunRecorder:
+    """Tiempos por etapa de una corrida.
+
+    Las etapas son exclusivas: mientras corre una etapa anidada, el tiempo se
+    le cuenta solo a ella y no a la que la contiene. La memoria (RSS) se
+    muestrea al entrar y salir de cada etapa y se guarda el pico observado.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.times = dict.fromkeys(GD_RUN_STAGES, 0.0)
+        self.row_count = 0
+        self.output_size = 0
+        self.from_cache = False
+        self.rss_start = self.rss_peak = _rss_kb()
+        self._stack = []
+
+    def sample_rss(self):
+        self.rss_peak = max(self.rss_peak, _rss_kb())
+
+    @contextmanager
+    def stage(self, name):
+        self.sample_rss()
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.times[parent[0]] += now - parent[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            self.sample_rss()
+            name, start = self._stack.pop()
+            end = time.perf_counter()
+            self.times[name] += end - start
+            if self._stack:
+                self._stack[-1][1] = end
+
+
+class GdReportRun(models.Model):
+    """Telemetría de cada corrida de reporte (Excel de los wizards y PDFs de
+    venta/compra): parámetros, filas, consultas SQL, tiempo por etapa, delta
+    del pico de memoria (RSS) y tamaño del archivo."""
+
+    _name = "gd.report.run"
+    _description = "GD - Corrida de reporte"
+    _order = "id desc"
+
+    name = fields.Char(string="Reporte", required=True)
+    report_model = fields.Char(string="Modelo del reporte", required=True, index=True)
+    report_type = fields.Selection([("xlsx", "Excel"), ("pdf", "PDF")], string="Tipo", required=True)
+    user_id = fields.Many2one("res.users", string="Usuario")
+    company_id = fields.Many2one("res.company", string="Compañía")
+    params = fields.Json(string="Parámetros")
+    state = fields.Selection([("done", "Listo"), ("failed", "Error")], string="Estado", required=True)
+    error = fields.Text(string="Error")
+    from_cache = fields.Boolean(string="Desde caché")
+
+    row_count = fields.Integer(string="Filas", aggregator="sum")
+    query_count = fields.Integer(string="Consultas SQL", aggregator="avg")
+    duration = fields.Float(string="Duración (s)", digits=(16, 3), aggregator="avg")
+    time_suppliers = fields.Float(string="Proveedor -> productos (s)", digits=(16, 3), aggregator="avg")
+    time_aggregation = fields.Float(string="Agregación (s)", digits=(16, 3), aggregator="avg")
+    time_stock = fields.Float(string="Stock / histórico (s)", digits=(16, 3), aggregator="avg")
+    time_images = fields.Float(string="Imágenes (s)", digits=(16, 3), aggregator="avg")
+    time_xlsx = fields.Float(string="Escritura Excel (s)", digits=(16, 3), aggregator="avg")
+    time_encoding = fields.Float(string="Guardado del archivo (s)", digits=(16, 3), aggregator="avg")
+    time_render = fields.Float(string="Render PDF (s)", digits=(16, 3), aggregator="avg")
+    rss_peak_delta_kb = fields.Integer(
+        string="Delta pico RSS (KB)", aggregator="max",
+        help="Pico de RSS observado en los límites de etapa menos el RSS al empezar la corrida.",
+    )
+    output_size = fields.Integer(string="Tamaño (bytes)", aggregator="avg")
+
+    # -------------------------
+    # Medición
+    # -------------------------
+    @contextmanager
+    def _gd_record(self, name, report_model, report_type, params, company):
+        """Mide lo que corre dentro del ``with``; entrega el medidor.
+
+        Quien genera debe propagar ``gd_report_run_key=recorder.key`` en el
+        contexto para que ``_gd_stage`` encuentre el medidor. La corrida se
+        guarda en un cursor aparte, así queda registrada aunque falle.
+        """
+        key = next(_RUN_KEYS)
+        recorder = _ACTIVE_RUNS[key] = _RunRecorder(key)
+        cr = self.env.cr
+        start_count = cr.sql_log_count
+        start = time.perf_counter()
+        state, error = "done", False
+        try:
+            yield recorder
+        except Exception as e:
+            state, error = "failed", str(e)
+            raise
+        finally:
+            _ACTIVE_RUNS.pop(key, None)
+            recorder.sample_rss()
+            vals = {
+                "name": name,
+                "report_model": report_model,
+                "report_type": report_type,
+                "user_id": self.env.uid,
+                "company_id": company.id,
+                "params": params,
+                "state": state,
+                "error": error,
+                "from_cache": recorder.from_cache,
+                "row_count": recorder.row_count,
+                "query_count": cr.sql_log_count - start_count,
+                "duration": time.perf_counter() - start,
+                "rss_peak_delta_kb": recorder.rss_peak - recorder.rss_start,
+                "output_size": recorder.output_size,
+            }
+            for stage, field_name in GD_RUN_STAGES.items():
+                vals[field_name] = recorder.times[stage]
+            self._gd_save(vals)
+
+    @api.model
+    def _gd_save(self, vals):
+        try:
+            with self.env.registry.cursor() as cr:
+                self.with_env(self.env(cr=cr, su=True)).create(vals)
+        except Exception:
+            # La telemetría nunca debe romper el reporte
+            _logger.exception("[GD_RUN] no se pudo registrar la corrida de %s", vals.get("report_model"))
+
+    @api.model
+    def _gd_recorder(self):
+        return _ACTIVE_RUNS.get(self.env.context.get("gd_report_run_key"))
+
+    @api.model
+    def _gd_stage(self, name):
+        recorder = self._gd_recorder()
+        return recorder.stage(name) if recorder else nullcontext()
+
+    # -------------------------
+    # Retención
+    # -------------------------
+    @api.model
+    def _gd_cron_gc_runs(self):
+        ICP = self.env["ir.config_parameter"].sudo()
+        try:
+            days = int(ICP.get_param(REPORT_RUN_RETENTION_PARAM, REPORT_RUN_RETENTION_DEFAULT))
+        except (TypeError, ValueError):
+            days = REPORT_RUN_RETENTION_DEFAULT
+        if days <= 0:
+            return
+        old = self.sudo().search([("create_date", "<", fields.Datetime.now() - timedelta(days=days))])
+        if old:
+            _logger.info("[GD_RUN] borrando %s corridas de más de %s días", len(old), days)
+            old.unlink()
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+from array import array
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class GdSalesAggregator(models.AbstractModel):
+    """Ventas netas (facturas - notas de crédito de cliente) por producto.
+
+    Lee la tabla diaria ``gd.sales.daily`` (unos miles de filas por rango en
+    lugar de millones de apuntes). Cada periodo pedido es un par de agregados
+    condicionales dentro del mismo escaneo. Los periodos ya cerrados
+    contablemente salen de ``gd.sales.closed.period`` (calculados una vez).
+    ``_get_net_sales_live`` hace lo mismo directo sobre ``account_move_line``
+    (verificación/benchmarks).
+    """
+
+    _name = "gd.sales.aggregator"
+    _description = "GD - Agregación de ventas por producto"
+
+    @api.model
+    def _gd_execute(self, label, query, params):
+        """Ejecuta una consulta de agregación (con su plan en modo diagnóstico)."""
+        self.env["gd.report.diagnostic"]._gd_explain(label, query, params)
+        self.env.cr.execute(query, params)
+
+    @api.model
+    def _get_net_sales(self, company_id, product_ids, periods):
+        """Retorna dict product_id -> tupla (qty_p0, amount_p0, qty_p1, amount_p1, ...).
+
+        ``periods`` es una lista de (date_from, date_to) inclusivos, sobre la
+        fecha contable del asiento. Solo aparecen productos con alguna venta en
+        alguno de los periodos (los valores pueden ser 0 en los demás).
+        """
+        if not product_ids or not periods:
+            return {}
+
+        ClosedPeriod = self.env["gd.sales.closed.period"].sudo()
+        company = self.env["res.company"].browse(company_id)
+        closed_idx = [i for i, (_df, date_to) in enumerate(periods) if ClosedPeriod._gd_is_closed(company, date_to)]
+        if not closed_idx:
+            return self._get_net_sales_daily(company_id, product_ids, periods)
+
+        open_idx = [i for i in range(len(periods)) if i not in closed_idx]
+        closed = ClosedPeriod._gd_get_net_sales(company_id, product_ids, [periods[i] for i in closed_idx])
+        if closed is None:
+            return self._get_net_sales_daily(company_id, product_ids, periods)
+
+        parts = [(closed_idx, closed)]
+        if open_idx:
+            parts.append((open_idx, self._get_net_sales_daily(company_id, product_ids, [periods[i] for i in open_idx])))
+
+        # Reubica cada resultado parcial en la posición de su periodo
+        res = {}
+        width = 2 * len(periods)
+        for indexes, sales in parts:
+            for pid, values in sales.items():
+                row = res.setdefault(pid, [0.0] * width)
+                for k, i in enumerate(indexes):
+                    row[2 * i] = values[2 * k]
+                    row[2 * i + 1] = values[2 * k + 1]
+        return {pid: tuple(row) for pid, row in res.items()}
+
+    @api.model
+    def _get_net_sales_daily(self, company_id, product_ids, periods):
+        """``_get_net_sales`` leyendo siempre la tabla diaria."""
+        if not product_ids or not periods:
+            return {}
+
+        columns = []
+        params = []
+        for date_from, date_to in periods:
+            columns.append(
+                "SUM(CASE WHEN d.date BETWEEN %s AND %s THEN d.quantity ELSE 0 END),"
+                " SUM(CASE WHEN d.date BETWEEN %s AND %s THEN d.amount ELSE 0 END)"
+            )
+            params += [date_from, date_to, date_from, date_to]
+
+        range_filter = " OR ".join(["d.date BETWEEN %s AND %s"] * len(periods))
+        range_params = [d for period in periods for d in period]
+
+        self.env["gd.sales.daily"].flush_model()
+        self._gd_execute("ventas por periodo", f"""
+            SELECT d.product_id, {", ".join(columns)}
+              FROM gd_sales_daily d
+             WHERE d.product_id = ANY(%s)
+               AND d.company_id = %s
+               AND ({range_filter})
+             GROUP BY d.product_id
+        """, params + [list(product_ids), company_id] + range_params)
+        res = {row[0]: tuple(float(v or 0.0) for v in row[1:]) for row in self.env.cr.fetchall()}
+        _logger.debug(
+            "[GD_SALES] company=%s productos=%s periodos=%s -> %s productos con ventas",
+            company_id, len(product_ids), len(periods), len(res),
+        )
+        return res
+
+    @api.model
+    def _get_ranked_net_sales(self, company_id, product_ids, date_from, date_to, limit,
+                              descending=True, include_unsold=False, only_in_stock=False):
+        """Los ``limit`` productos con más (o menos) cantidad neta vendida en el rango.
+
+        Retorna lista de (product_id, qty, amount) ordenada por qty y luego
+        amount (desempate). El orden y el corte se hacen en la consulta
+        (ORDER BY ... LIMIT).
+
+        - ``include_unsold``: los productos de ``product_ids`` sin ventas entran
+          con 0 (LEFT JOIN del conjunto de productos contra el agregado); si no,
+          productos sin movimiento neto no aparecen.
+        - ``only_in_stock``: solo productos con existencias en ubicaciones internas.
+        """
+        if not product_ids or limit <= 0:
+            return []
+        direction = "DESC" if descending else "ASC"
+
+        ClosedPeriod = self.env["gd.sales.closed.period"].sudo()
+        company = self.env["res.company"].browse(company_id)
+        if ClosedPeriod._gd_is_closed(company, date_to):
+            period_id = ClosedPeriod._gd_get_period(company, date_from, date_to)
+            if period_id is None:
+                # Periodo en cálculo por otro proceso: ranking en Python
+                return self._rank_net_sales_python(
+                    company_id, product_ids, date_from, date_to, limit,
+                    descending, include_unsold, only_in_stock,
+                )
+            sales_sql = """
+                SELECT l.product_id, l.quantity AS qty, l.amount
+                  FROM gd_sales_closed_period_line l
+                 WHERE l.period_id = %s
+                   AND l.product_id = ANY(%s)
+            """
+            sales_params = [period_id, list(product_ids)]
+        else:
+            self.env["gd.sales.daily"].flush_model()
+            sales_sql = """
+                SELECT d.product_id, SUM(d.quantity) AS qty, SUM(d.amount) AS amount
+                  FROM gd_sales_daily d
+                 WHERE d.product_id = ANY(%s)
+                   AND d.company_id = %s
+                   AND d.date BETWEEN %s AND %s
+                 GROUP BY d.product_id
+            """
+            sales_params = [list(product_ids), company_id, date_from, date_to]
+
+        where = ["TRUE"]
+        params = sales_params + [list(product_ids)]
+        if not include_unsold:
+            where.append("(abs(COALESCE(s.qty, 0)) > 1e-9 OR abs(COALESCE(s.amount, 0)) > 1e-9)")
+        if only_in_stock:
+            where.append(f"p.id IN ({self._in_stock_sql()})")
+            params += [list(product_ids), company_id]
+
+        self._gd_execute("ranking", f"""
+            WITH sales AS ({sales_sql})
+            SELECT p.id, COALESCE(s.qty, 0) AS qty, COALESCE(s.amount, 0) AS amount
+              FROM unnest(%s::int[]) AS p(id)
+              LEFT JOIN sales s ON s.product_id = p.id
+             WHERE {" AND ".join(where)}
+             ORDER BY qty {direction}, amount {direction}, p.id
+             LIMIT %s
+        """, params + [limit])
+        return [(pid, float(qty or 0.0), float(amount or 0.0)) for pid, qty, amount in self.env.cr.fetchall()]
+
+    @api.model
+    def _in_stock_sql(self):
+        """Subconsulta de productos (de ``%s`` ids) con stock > 0 en la compañía ``%s``."""
+        return """
+            SELECT q.product_id
+              FROM stock_quant q
+              JOIN stock_location loc ON loc.id = q.location_id
+             WHERE q.product_id = ANY(%s)
+               AND loc.usage = 'internal'
+               AND loc.company_id = %s
+             GROUP BY q.product_id
+            HAVING SUM(q.quantity) > 0
+        """
+
+    @api.model
+    def _rank_net_sales_python(self, company_id, product_ids, date_from, date_to, limit,
+                               descending, include_unsold, only_in_stock):
+        sales = self._get_net_sales_daily(company_id, product_ids, [(date_from, date_to)])
+        if only_in_stock:
+            self.env.cr.execute(self._in_stock_sql(), [list(product_ids), company_id])
+            allowed = {r[0] for r in self.env.cr.fetchall()}
+        else:
+            allowed = None
+        if include_unsold:
+            rows = ((pid,) + sales.get(pid, (0.0, 0.0)) for pid in product_ids)
+        else:
+            rows = ((pid, qty, amount) for pid, (qty, amount) in sales.items())
+        if allowed is not None:
+            rows = (r for r in rows if r[0] in allowed)
+        return self._rank_net_sales(rows, limit, descending, keep_zero=include_unsold)
+
+    @api.model
+    def _rank_net_sales(self, rows, limit, descending=True, keep_zero=False):
+        """Ranking en streaming (heap de tamaño ``limit``) de (product_id, qty, amount)."""
+        if not keep_zero:
+            rows = (r for r in rows if abs(r[1]) > 1e-9 or abs(r[2]) > 1e-9)
+        if descending:
+            return heapq.nlargest(limit, rows, key=lambda r: (r[1], r[2], -r[0]))
+        return heapq.nsmallest(limit, rows, key=lambda r: (r[1], r[2], r[0]))
+
+    @api.model
+    def _get_net_sales_monthly(self, company_id, product_ids, ranges):
+        """Ventas netas por mes de cada rango, en un solo escaneo agrupado.
+
+        ``ranges`` es una lista de (date_from, date_to). Retorna ``(buckets, sales)``:
+        ``buckets`` = lista ordenada de (índice de rango, primer día del mes) y
+        ``sales`` = dict product_id -> array('d') con (qty, amount) por bucket.
+        Un mes parcial en los extremos solo suma los días dentro del rango.
+        """
+        buckets = []
+        for idx, (date_from, date_to) in enumerate(ranges):
+            month = fields.Date.to_date(date_from).replace(day=1)
+            last = fields.Date.to_date(date_to)
+            while month <= last:
+                buckets.append((idx, month))
+                month += relativedelta(months=1)
+        if not product_ids or not buckets:
+            return buckets, {}
+
+        position = {bucket: i for i, bucket in enumerate(buckets)}
+        width = 2 * len(buckets)
+
+        values_sql = ", ".join(["(%s, %s::date, %s::date)"] * len(ranges))
+        range_params = [v for idx, (date_from, date_to) in enumerate(ranges) for v in (idx, date_from, date_to)]
+
+        self.env["gd.sales.daily"].flush_model()
+        self._gd_execute("ventas mensuales", f"""
+            SELECT d.product_id, r.idx, date_trunc('month', d.date)::date, SUM(d.quantity), SUM(d.amount)
+              FROM gd_sales_daily d
+              JOIN (VALUES {values_sql}) AS r(idx, date_from, date_to)
+                ON d.date BETWEEN r.date_from AND r.date_to
+             WHERE d.product_id = ANY(%s)
+               AND d.company_id = %s
+             GROUP BY d.product_id, r.idx, date_trunc('month', d.date)
+        """, range_params + [list(product_ids), company_id])
+
+        # Pivot en memoria: un array plano por producto, sin dicts por celda
+        sales = {}
+        for product_id, idx, month, qty, amount in self.env.cr.fetchall():
+            acc = sales.get(product_id)
+            if acc is None:
+                acc = sales[product_id] = array("d", bytes(8 * width))
+            col = 2 * position[(idx, month)]
+            acc[col] += qty or 0.0
+            acc[col + 1] += amount or 0.0
+        return buckets, sales
+
+    @api.model
+    def _get_net_sales_live(self, company_id, product_ids, periods):
+        """Igual que ``_get_net_sales`` pero en una pasada sobre account_move_line."""
+        if not product_ids or not periods:
+            return {}
+
+        # Notas de crédito restan
+        sign = "CASE WHEN m.move_type = 'out_refund' THEN -1 ELSE 1 END"
+        columns = []
+        params = []
+        for date_from, date_to in periods:
+            columns.append(
+                f"SUM(CASE WHEN m.date BETWEEN %s AND %s THEN {sign} * aml.quantity ELSE 0 END),"
+                f" SUM(CASE WHEN m.date BETWEEN %s AND %s THEN {sign} * aml.price_subtotal ELSE 0 END)"
+            )
+            params += [date_from, date_to, date_from, date_to]
+
+        range_filter = " OR ".join(["m.date BETWEEN %s AND %s"] * len(periods))
+        range_params = [d for period in periods for d in period]
+
+        query = f"""
+            SELECT aml.product_id, {", ".join(columns)}
+              FROM account_move_line aml
+              JOIN account_move m ON m.id = aml.move_id
+             WHERE aml.product_id = ANY(%s)
+               AND aml.display_type = 'product'
+               AND m.company_id = %s
+               AND m.state = 'posted'
+               AND m.move_type IN ('out_invoice', 'out_refund')
+               AND ({range_filter})
+             GROUP BY aml.product_id
+        """
+        self.env.cr.execute(query, params + [list(product_ids), company_id] + range_params)
+        return {row[0]: tuple(float(v or 0.0) for v in row[1:]) for row in self.env.cr.fetchall()}
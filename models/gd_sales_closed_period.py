@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Bloqueos que impiden publicar facturas de cliente en una fecha
+GD_SALES_LOCK_FIELDS = ("fiscalyear_lock_date", "sale_lock_date", "hard_lock_date")
+
+
+class GdSalesClosedPeriod(models.Model):
+    """Ventas netas por producto de un periodo ya cerrado contablemente.
+
+    Un periodo que termina en o antes de la fecha de bloqueo de la compañía no
+    puede cambiar: sus agregados se calculan una vez (para todos los productos,
+    así sirven a cualquier proveedor) y se reutilizan siempre. Solo se borran
+    si la fecha de bloqueo retrocede o si se publica algo dentro del periodo
+    (excepciones de bloqueo).
+    """
+
+    _name = "gd.sales.closed.period"
+    _description = "GD - Ventas de periodo cerrado"
+    _order = "date_from desc"
+
+    company_id = fields.Many2one("res.company", string="Compañía", required=True, ondelete="cascade")
+    date_from = fields.Date(string="Desde", required=True)
+    date_to = fields.Date(string="Hasta", required=True)
+    lock_date = fields.Date(string="Fecha de bloqueo al calcular")
+    line_ids = fields.One2many("gd.sales.closed.period.line", "period_id", string="Productos")
+
+    _sql_constraints = [
+        ("company_range_uniq", "unique(company_id, date_from, date_to)",
+         "Ya existe el periodo cerrado para esta compañía."),
+    ]
+
+    # -------------------------
+    # Fecha de bloqueo
+    # -------------------------
+    @api.model
+    def _gd_lock_date(self, company):
+        """Última fecha en la que ya no se pueden publicar ventas (o None)."""
+        dates = [company[f] for f in GD_SALES_LOCK_FIELDS if f in company._fields and company[f]]
+        return max(dates) if dates else None
+
+    @api.model
+    def _gd_is_closed(self, company, date_to):
+        lock_date = self._gd_lock_date(company)
+        return bool(lock_date) and fields.Date.to_date(date_to) <= lock_date
+
+    # -------------------------
+    # Lectura
+    # -------------------------
+    @api.model
+    def _gd_get_net_sales(self, company_id, product_ids, periods):
+        """Igual que gd.sales.aggregator._get_net_sales, para periodos cerrados."""
+        company = self.env["res.company"].browse(company_id)
+        period_ids = [self._gd_get_period(company, date_from, date_to) for date_from, date_to in periods]
+        if any(pid is None for pid in period_ids):
+            return None
+
+        columns = []
+        params = []
+        for period_id in period_ids:
+            columns.append(
+                "SUM(CASE WHEN l.period_id = %s THEN l.quantity ELSE 0 END),"
+                " SUM(CASE WHEN l.period_id = %s THEN l.amount ELSE 0 END)"
+            )
+            params += [period_id, period_id]
+
+        self.env["gd.sales.aggregator"]._gd_execute("ventas de periodos cerrados", f"""
+            SELECT l.product_id, {", ".join(columns)}
+              FROM gd_sales_closed_period_line l
+             WHERE l.period_id = ANY(%s)
+               AND l.product_id = ANY(%s)
+             GROUP BY l.product_id
+        """, params + [period_ids, list(product_ids)])
+        return {row[0]: tuple(float(v or 0.0) for v in row[1:]) for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _gd_get_period(self, company, date_from, date_to):
+        """Id del periodo cerrado, calculándolo la primera vez (None si otro
+        proceso lo calculó a la vez y todavía no se ve)."""
+        cr = self.env.cr
+        cr.execute("""
+            SELECT id FROM gd_sales_closed_period
+             WHERE company_id = %s AND date_from = %s AND date_to = %s
+        """, [company.id, date_from, date_to])
+        row = cr.fetchone()
+        if row:
+            return row[0]
+
+        self.env["gd.sales.daily"].flush_model()
+        cr.execute("""
+            INSERT INTO gd_sales_closed_period
+                   (company_id, date_from, date_to, lock_date,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (%(company_id)s, %(date_from)s, %(date_to)s, %(lock_date)s,
+                    %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+            ON CONFLICT (company_id, date_from, date_to) DO NOTHING
+            RETURNING id
+        """, {
+            "company_id": company.id,
+            "date_from": date_from,
+            "date_to": date_to,
+            "lock_date": self._gd_lock_date(company),
+            "uid": self.env.uid,
+        })
+        row = cr.fetchone()
+        if not row:
+            _logger.info("[GD_SALES] periodo cerrado %s..%s en cálculo concurrente; se lee en vivo", date_from, date_to)
+            return None
+
+        period_id = row[0]
+        cr.execute("""
+            INSERT INTO gd_sales_closed_period_line (period_id, product_id, quantity, amount)
+            SELECT %s, d.product_id, SUM(d.quantity), SUM(d.amount)
+              FROM gd_sales_daily d
+             WHERE d.company_id = %s
+               AND d.date BETWEEN %s AND %s
+             GROUP BY d.product_id
+        """, [period_id, company.id, date_from, date_to])
+        _logger.info(
+            "[GD_SALES] periodo cerrado %s..%s (compañía %s) guardado: %s productos",
+            date_from, date_to, company.id, cr.rowcount,
+        )
+        return period_id
+
+    # -------------------------
+    # Invalidación
+    # -------------------------
+    @api.model
+    def _gd_invalidate_after(self, company, lock_date):
+        """La fecha de bloqueo retrocedió: los periodos posteriores dejan de ser fijos."""
+        domain = [("company_id", "=", company.id)]
+        if lock_date:
+            domain.append(("date_to", ">", lock_date))
+        periods = self.sudo().search(domain)
+        if periods:
+            _logger.info("[GD_SALES] bloqueo de %s retrocedió a %s: %s periodos cerrados descartados",
+                         company.id, lock_date, len(periods))
+            periods.unlink()
+
+    @api.model
+    def _gd_invalidate_dates(self, company_ids, dates):
+        """Se publicó/canceló algo en fechas ya cubiertas (excepción de bloqueo)."""
+        if not company_ids:
+            return
+        self.env.cr.execute("""
+            DELETE FROM gd_sales_closed_period p
+             USING unnest(%s::int[], %s::date[]) AS k(company_id, date)
+             WHERE p.company_id = k.company_id
+               AND k.date BETWEEN p.date_from AND p.date_to
+        """, [list(company_ids), list(dates)])
+        if self.env.cr.rowcount:
+            self.invalidate_model()
+
+
+class GdSalesClosedPeriodLine(models.Model):
+    _name = "gd.sales.closed.period.line"
+    _description = "GD - Ventas de periodo cerrado por producto"
+    _log_access = False
+
+    period_id = fields.Many2one("gd.sales.closed.period", required=True, ondelete="cascade", index=True)
+    product_id = fields.Many2one("product.product", string="Producto", required=True, ondelete="cascade")
+    quantity = fields.Float(string="Cantidad neta")
+    amount = fields.Float(string="Monto neto")
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Líneas de venta que cuentan: producto, factura/nota de crédito de cliente publicada
+GD_SALES_SOURCE_SQL = """
+    SELECT m.company_id,
+           aml.product_id,
+           m.date,
+           SUM(CASE WHEN m.move_type = 'out_refund' THEN -1 ELSE 1 END * aml.quantity),
+           SUM(CASE WHEN m.move_type = 'out_refund' THEN -1 ELSE 1 END * aml.price_subtotal)
+      FROM account_move_line aml
+      JOIN account_move m ON m.id = aml.move_id
+     WHERE aml.product_id IS NOT NULL
+       AND aml.display_type = 'product'
+       AND m.state = 'posted'
+       AND m.move_type IN ('out_invoice', 'out_refund')
+       {extra}
+     GROUP BY m.company_id, aml.product_id, m.date
+"""
+
+
+class GdSalesDaily(models.Model):
+    """Ventas netas diarias por compañía y producto.
+
+    Se actualiza al publicar, pasar a borrador o cancelar facturas/notas de
+    crédito de cliente; ``_gd_rebuild()`` la regenera completa desde
+    ``account.move.line``.
+    """
+
+    _name = "gd.sales.daily"
+    _description = "GD - Ventas netas diarias por producto"
+    _log_access = False
+    _order = "date desc"
+
+    company_id = fields.Many2one("res.company", string="Compañía", required=True, ondelete="cascade")
+    product_id = fields.Many2one("product.product", string="Producto", required=True, ondelete="cascade")
+    date = fields.Date(string="Fecha", required=True)
+    quantity = fields.Float(string="Cantidad neta")
+    amount = fields.Float(string="Monto neto")
+
+    _sql_constraints = [
+        ("company_product_date_uniq", "unique(company_id, product_id, date)",
+         "Ya existe el registro diario para este producto."),
+    ]
+
+    def init(self):
+        self.env.cr.execute("SELECT 1 FROM gd_sales_daily LIMIT 1")
+        if not self.env.cr.rowcount:
+            self._gd_rebuild()
+
+    @api.model
+    def _gd_rebuild(self):
+        """Regenera toda la tabla desde account.move.line (histórico completo)."""
+        cr = self.env.cr
+        cr.execute("TRUNCATE gd_sales_daily")
+        cr.execute(f"""
+            INSERT INTO gd_sales_daily (company_id, product_id, date, quantity, amount)
+            {GD_SALES_SOURCE_SQL.format(extra="")}
+        """)
+        _logger.info("[GD_SALES] gd.sales.daily reconstruida: %s filas", cr.rowcount)
+        self.invalidate_model()
+        # Los periodos cerrados se calcularon desde esta tabla
+        cr.execute("DELETE FROM gd_sales_closed_period")
+        self.env["gd.sales.closed.period"].invalidate_model()
+
+    @api.model
+    def _gd_refresh_moves(self, moves):
+        """Recalcula los días/productos tocados por las facturas dadas."""
+        moves = moves.filtered(lambda m: m.move_type in ("out_invoice", "out_refund"))
+        if not moves:
+            return
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("""
+            SELECT DISTINCT m.company_id, aml.product_id, m.date
+              FROM account_move_line aml
+              JOIN account_move m ON m.id = aml.move_id
+             WHERE m.id IN %s
+               AND aml.product_id IS NOT NULL
+               AND aml.display_type = 'product'
+        """, [tuple(moves.ids)])
+        keys = cr.fetchall()
+        if not keys:
+            return
+        company_ids, product_ids, dates = (list(col) for col in zip(*keys))
+        self.env["gd.sales.closed.period"]._gd_invalidate_dates(company_ids, dates)
+        key_filter = """
+            AND (m.company_id, aml.product_id, m.date) IN (
+                SELECT * FROM unnest(%(company_ids)s::int[], %(product_ids)s::int[], %(dates)s::date[])
+            )
+        """
+        params = {"company_ids": company_ids, "product_ids": product_ids, "dates": dates}
+        # Upsert en vez de DELETE + INSERT: dos facturas publicadas a la vez
+        # para una clave nueva no chocan con la restricción única (si ambas
+        # tocan la misma fila, PostgreSQL da un error de serialización y Odoo
+        # reintenta la transacción).
+        cr.execute(f"""
+            INSERT INTO gd_sales_daily (company_id, product_id, date, quantity, amount)
+            {GD_SALES_SOURCE_SQL.format(extra=key_filter)}
+            ON CONFLICT (company_id, product_id, date)
+            DO UPDATE SET quantity = EXCLUDED.quantity, amount = EXCLUDED.amount
+        """, params)
+        # Claves que ya no tienen ventas publicadas (factura a borrador o cancelada)
+        cr.execute("""
+            DELETE FROM gd_sales_daily d
+             USING unnest(%(company_ids)s::int[], %(product_ids)s::int[], %(dates)s::date[])
+                   AS k(company_id, product_id, date)
+             WHERE d.company_id = k.company_id
+               AND d.product_id = k.product_id
+               AND d.date = k.date
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM account_move_line aml
+                      JOIN account_move m ON m.id = aml.move_id
+                     WHERE aml.product_id = k.product_id
+                       AND aml.display_type = 'product'
+                       AND m.company_id = k.company_id
+                       AND m.date = k.date
+                       AND m.state = 'posted'
+                       AND m.move_type IN ('out_invoice', 'out_refund')
+               )
+        """, params)
+        self.invalidate_model()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class GdStockSnapshot(models.Model):
+    """Foto periódica (mensual) del stock por compañía y producto.
+
+    El stock a una fecha T se calcula como la última foto <= T más el neto de
+    las move lines DONE entre la foto y T que entran/salen de ubicaciones
+    internas de la compañía, en una sola agregación SQL.
+    """
+
+    _name = "gd.stock.snapshot"
+    _description = "GD - Foto de stock por producto"
+    _log_access = False
+    _order = "snapshot_at desc"
+
+    company_id = fields.Many2one("res.company", string="Compañía", required=True, ondelete="cascade")
+    product_id = fields.Many2one("product.product", string="Producto", required=True, ondelete="cascade")
+    snapshot_at = fields.Datetime(string="Fecha de la foto", required=True)
+    quantity = fields.Float(string="Cantidad")
+
+    _sql_constraints = [
+        ("company_product_at_uniq", "unique(company_id, product_id, snapshot_at)",
+         "Ya existe una foto de stock para este producto en esa fecha."),
+    ]
+
+    # -------------------------
+    # SQL compartido
+    # -------------------------
+    @api.model
+    def _gd_move_line_qty_column(self):
+        """Columna de cantidad en UdM del producto (Odoo 17+) o la cantidad tal cual."""
+        fields_ml = self.env["stock.move.line"]._fields
+        for fname in ("quantity_product_uom", "quantity", "qty_done"):
+            field = fields_ml.get(fname)
+            if field and field.store:
+                return fname
+        return "quantity"
+
+    @api.model
+    def _gd_move_sign_sql(self):
+        """+1 entra a stock interno de la compañía, -1 sale, 0 movimiento interno."""
+        return """
+            ((dl.usage = 'internal' AND dl.company_id = %(company_id)s)::int
+             - (sl.usage = 'internal' AND sl.company_id = %(company_id)s)::int)
+        """
+
+    # -------------------------
+    # Stock a una fecha
+    # -------------------------
+    @api.model
+    def _get_stock_at(self, company_id, product_ids, at):
+        """Dict product_id -> cantidad en ubicaciones internas de la compañía a la fecha ``at`` (UTC)."""
+        if not product_ids:
+            return {}
+        self.env.flush_all()
+        qty = self._gd_move_line_qty_column()
+        self.env.cr.execute(f"""
+            WITH snap AS (
+                SELECT DISTINCT ON (s.product_id) s.product_id, s.snapshot_at, s.quantity
+                  FROM gd_stock_snapshot s
+                 WHERE s.company_id = %(company_id)s
+                   AND s.product_id = ANY(%(product_ids)s)
+                   AND s.snapshot_at <= %(at)s
+                 ORDER BY s.product_id, s.snapshot_at DESC
+            )
+            SELECT p.product_id,
+                   COALESCE(snap.quantity, 0)
+                   + COALESCE(SUM({self._gd_move_sign_sql()} * ml.{qty}), 0)
+              FROM unnest(%(product_ids)s::int[]) AS p(product_id)
+         LEFT JOIN snap ON snap.product_id = p.product_id
+         LEFT JOIN stock_move_line ml
+                ON ml.product_id = p.product_id
+               AND ml.state = 'done'
+               AND ml.date > COALESCE(snap.snapshot_at, '-infinity'::timestamp)
+               AND ml.date <= %(at)s
+         LEFT JOIN stock_location sl ON sl.id = ml.location_id
+         LEFT JOIN stock_location dl ON dl.id = ml.location_dest_id
+             GROUP BY p.product_id, snap.quantity
+        """, {"company_id": company_id, "product_ids": list(product_ids), "at": at})
+        return {pid: float(q or 0.0) for pid, q in self.env.cr.fetchall()}
+
+    # -------------------------
+    # Toma de fotos
+    # -------------------------
+    @api.model
+    def _gd_take_snapshot(self, company_id, at):
+        """Foto al instante ``at``: quants internos actuales menos el neto movido después de ``at``.
+
+        Rehacer una foto la reemplaza entera: los productos que ya no tienen
+        quants ni movimientos posteriores no conservan la cantidad anterior.
+        """
+        self.env.flush_all()
+        qty = self._gd_move_line_qty_column()
+        self.env.cr.execute("""
+            DELETE FROM gd_stock_snapshot
+             WHERE company_id = %s AND snapshot_at = %s
+        """, [company_id, at])
+        self.env.cr.execute(f"""
+            INSERT INTO gd_stock_snapshot (company_id, product_id, snapshot_at, quantity)
+            SELECT %(company_id)s, t.product_id, %(at)s, SUM(t.qty)
+              FROM (
+                    SELECT q.product_id, q.quantity AS qty
+                      FROM stock_quant q
+                      JOIN stock_location l ON l.id = q.location_id
+                     WHERE l.usage = 'internal'
+                       AND l.company_id = %(company_id)s
+                 UNION ALL
+                    SELECT ml.product_id, -({self._gd_move_sign_sql()} * ml.{qty})
+                      FROM stock_move_line ml
+                      JOIN stock_location sl ON sl.id = ml.location_id
+                      JOIN stock_location dl ON dl.id = ml.location_dest_id
+                     WHERE ml.state = 'done'
+                       AND ml.date > %(at)s
+                   ) t
+             GROUP BY t.product_id
+            ON CONFLICT (company_id, product_id, snapshot_at)
+            DO UPDATE SET quantity = EXCLUDED.quantity
+        """, {"company_id": company_id, "at": at})
+        _logger.info("[GD_STOCK] foto de stock company=%s at=%s: %s productos", company_id, at, self.env.cr.rowcount)
+        self.invalidate_model()
+
+    @api.model
+    def _gd_backfill(self, months=24, company_ids=None):
+        """Fotos a inicio de mes (UTC) de los últimos ``months`` meses."""
+        companies = self.env["res.company"].browse(company_ids) if company_ids else self.env["res.company"].search([])
+        month_start = datetime.combine(fields.Date.today().replace(day=1), datetime.min.time())
+        for company in companies:
+            for i in range(months):
+                self._gd_take_snapshot(company.id, month_start - relativedelta(months=i))
+
+    @api.model
+    def _gd_cron_take_snapshots(self):
+        # Mes actual y anterior: el anterior se rehace por movimientos con fecha atrasada
+        self._gd_backfill(months=2)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+
+from .gd_supplier_product_resolver import SIGNAL_SEQUENCE
+
+_logger = logging.getLogger(__name__)
+
+
+class GdSupplierProduct(models.Model):
+    """Relación proveedor -> variante desnormalizada (una fila por supplierinfo y variante).
+
+    Se mantiene al crear/modificar/eliminar ``product.supplierinfo`` y al crear,
+    archivar/desarchivar o eliminar variantes, para que los reportes puedan
+    unir ventas y stock contra esta tabla en SQL.
+
+    - supplierinfo a nivel variante: una fila con esa variante.
+    - supplierinfo a nivel plantilla: una fila por variante activa de la plantilla.
+    """
+
+    _name = "gd.supplier.product"
+    _description = "GD - Productos por proveedor"
+    _log_access = False
+
+    supplierinfo_id = fields.Many2one(
+        "product.supplierinfo",
+        string="Info proveedor",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    partner_id = fields.Many2one("res.partner", string="Proveedor", required=True, ondelete="cascade")
+    company_id = fields.Many2one("res.company", string="Compañía", ondelete="cascade")
+    product_id = fields.Many2one(
+        "product.product",
+        string="Producto",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+
+    _sql_constraints = [
+        ("supplierinfo_product_uniq", "unique(supplierinfo_id, product_id)",
+         "La variante ya está asociada a esta información de proveedor."),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS gd_supplier_product_partner_company_idx
+                ON gd_supplier_product (partner_id, company_id, product_id)
+        """)
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {SIGNAL_SEQUENCE}")
+        self.env.cr.execute("SELECT 1 FROM gd_supplier_product LIMIT 1")
+        if not self.env.cr.rowcount:
+            self._gd_rebuild()
+
+    # -------------------------
+    # Mantenimiento
+    # -------------------------
+    _GD_INSERT_SQL = """
+        INSERT INTO gd_supplier_product (supplierinfo_id, partner_id, company_id, product_id)
+        SELECT si.id, si.partner_id, si.company_id, si.product_id
+          FROM product_supplierinfo si
+         WHERE si.product_id IS NOT NULL {si_filter}
+         UNION
+        SELECT si.id, si.partner_id, si.company_id, pp.id
+          FROM product_supplierinfo si
+          JOIN product_product pp
+            ON pp.product_tmpl_id = si.product_tmpl_id
+           AND pp.active
+         WHERE si.product_id IS NULL {si_filter}
+        ON CONFLICT DO NOTHING
+    """
+
+    @api.model
+    def _gd_flush_sources(self):
+        """Escribe en la base solo lo que leen las consultas de esta tabla."""
+        self.env["product.supplierinfo"].flush_model(["partner_id", "product_id", "product_tmpl_id", "company_id"])
+        self.env["product.product"].flush_model(["active", "product_tmpl_id"])
+
+    @api.model
+    def _gd_rebuild(self, supplierinfo_ids=None):
+        """Regenera las filas de los supplierinfo dados (o de todos si es None)."""
+        self._gd_flush_sources()
+        cr = self.env.cr
+        if supplierinfo_ids is None:
+            cr.execute("TRUNCATE gd_supplier_product")
+            cr.execute(self._GD_INSERT_SQL.format(si_filter=""))
+            _logger.info("[GD_SUPPLIER] gd.supplier.product reconstruida: %s filas", cr.rowcount)
+        else:
+            supplierinfo_ids = tuple(supplierinfo_ids)
+            if not supplierinfo_ids:
+                return
+            cr.execute("DELETE FROM gd_supplier_product WHERE supplierinfo_id IN %s", [supplierinfo_ids])
+            cr.execute(self._GD_INSERT_SQL.format(si_filter="AND si.id IN %(ids)s"), {"ids": supplierinfo_ids})
+        self.invalidate_model()
+        self.env["gd.supplier.product.resolver"]._invalidate_cache()
+
+    @api.model
+    def _gd_refresh_products(self, products):
+        """Recalcula las filas afectadas por cambios en variantes (alta, archivado, plantilla)."""
+        if not products:
+            return
+        self._gd_flush_sources()
+        self.env.cr.execute("""
+            SELECT si.id
+              FROM product_supplierinfo si
+             WHERE si.product_id IN %(pids)s
+                OR (si.product_id IS NULL AND si.product_tmpl_id IN %(tids)s)
+             UNION
+            SELECT sp.supplierinfo_id
+              FROM gd_supplier_product sp
+             WHERE sp.product_id IN %(pids)s
+        """, {
+            "pids": tuple(products.ids),
+            "tids": tuple(products.with_context(active_test=False).product_tmpl_id.ids) or (0,),
+        })
+        self._gd_rebuild([r[0] for r in self.env.cr.fetchall()])
+        # Aunque no cambien filas, cambian las variantes por plantilla (whole_templates)
+        self.env["gd.supplier.product.resolver"]._invalidate_cache()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+# Secuencia que avisa a los demás workers que la caché quedó vieja
+SIGNAL_SEQUENCE = "gd_supplier_resolver_signal"
+
+# Caché propia del resolver: base de datos -> (valor de la señal, {clave: ids}).
+# No usa ormcache para que invalidarla no vacíe las cachés de todo el registro.
+_CACHES = {}
+
+
+class GdSupplierProductResolver(models.AbstractModel):
+    """Proveedor -> variantes de producto, compartido por los reportes GD.
+
+    Reglas (ver ``gd.supplier.product``):
+    - supplierinfo a nivel variante: esa variante.
+    - supplierinfo a nivel plantilla: todas las variantes activas de la plantilla.
+
+    Con ``whole_templates=True`` cada producto arrastra todas las variantes
+    activas de su plantilla (también con supplierinfo a nivel variante), que
+    es lo que siempre mostró el reporte de stock con imagen.
+
+    Lee la tabla mantenida ``gd.supplier.product``; el resultado se cachea por
+    (compañía, proveedor) y se invalida cada vez que esa tabla se actualiza.
+    Los demás workers se enteran por la secuencia ``SIGNAL_SEQUENCE``, que se
+    incrementa al confirmar la transacción que invalidó.
+    """
+
+    _name = "gd.supplier.product.resolver"
+    _description = "GD - Resolución de productos por proveedor"
+
+    @api.model
+    def _get_product_ids(self, company_id, supplier_id, whole_templates=False):
+        """Lista de ids de product.product del proveedor para la compañía."""
+        if not supplier_id:
+            return []
+        if whole_templates:
+            return list(self._get_template_product_ids_cached(company_id or False, supplier_id))
+        return list(self._get_product_ids_cached(company_id or False, supplier_id))
+
+    @api.model
+    def _get_product_ids_cached(self, company_id, supplier_id):
+        cache = self._gd_cache()
+        key = ("products", company_id, supplier_id)
+        if key not in cache:
+            self.env.cr.execute("""
+                SELECT DISTINCT sp.product_id
+                  FROM gd_supplier_product sp
+                 WHERE sp.partner_id = %(supplier_id)s
+                   AND (sp.company_id IS NULL OR sp.company_id = %(company_id)s)
+            """, {"company_id": company_id, "supplier_id": supplier_id})
+            cache[key] = tuple(sorted(r[0] for r in self.env.cr.fetchall()))
+            _logger.info(
+                "[GD_RESOLVER] company=%s supplier=%s -> %s productos",
+                company_id, supplier_id, len(cache[key]),
+            )
+        return cache[key]
+
+    @api.model
+    def _get_template_product_ids_cached(self, company_id, supplier_id):
+        cache = self._gd_cache()
+        key = ("templates", company_id, supplier_id)
+        if key not in cache:
+            self.env.cr.execute("""
+                SELECT DISTINCT pp.id
+                  FROM gd_supplier_product sp
+                  JOIN product_product src ON src.id = sp.product_id
+                  JOIN product_product pp
+                    ON pp.product_tmpl_id = src.product_tmpl_id
+                   AND pp.active
+                 WHERE sp.partner_id = %(supplier_id)s
+                   AND (sp.company_id IS NULL OR sp.company_id = %(company_id)s)
+            """, {"company_id": company_id, "supplier_id": supplier_id})
+            cache[key] = tuple(sorted(r[0] for r in self.env.cr.fetchall()))
+        return cache[key]
+
+    # -------------------------
+    # Caché
+    # -------------------------
+    @api.model
+    def _gd_cache(self):
+        """Caché de esta base; se descarta si otro worker la invalidó."""
+        self.env.cr.execute(f"SELECT last_value FROM {SIGNAL_SEQUENCE}")
+        signal = self.env.cr.fetchone()[0]
+        dbname = self.env.cr.dbname
+        entry = _CACHES.get(dbname)
+        if entry is None or entry[0] != signal:
+            entry = _CACHES[dbname] = (signal, {})
+        return entry[1]
+
+    @api.model
+    def _invalidate_cache(self):
+        """Vacía solo la caché del resolver (no las del registro)."""
+        dbname = self.env.cr.dbname
+        _CACHES.pop(dbname, None)
+        cr = self.env.cr
+        if not cr.postcommit.data.get("gd_supplier_signal"):
+            cr.postcommit.data["gd_supplier_signal"] = True
+            # lo leído dentro de una transacción que se revierte no vale
+            cr.postrollback.add(lambda: _CACHES.pop(dbname, None))
+            cr.postcommit.add(self._gd_signal_workers)
+
+    @api.model
+    def _gd_signal_workers(self):
+        with self.env.registry.cursor() as cr:
+            cr.execute(f"SELECT nextval('{SIGNAL_SEQUENCE}')")
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+# PDFs de los que se registra telemetría en gd.report.run
+GD_RUN_PDF_MODELS = ('sale.order', 'purchase.order')
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        report = self._get_report(report_ref)
+        if report.model not in GD_RUN_PDF_MODELS or not res_ids:
+            return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        ids = [res_ids] if isinstance(res_ids, int) else list(res_ids)
+        Run = self.env['gd.report.run']
+        with Run._gd_record(report.name, report.report_name, 'pdf', {'res_ids': ids}, self.env.company) as recorder:
+            self_run = self.with_context(gd_report_run_key=recorder.key)
+            with self_run.env['gd.report.run']._gd_stage('render'):
+                pdf_content, content_type = super(IrActionsReport, self_run)._render_qweb_pdf(
+                    report_ref, res_ids=res_ids, data=data
+                )
+            recorder.row_count = len(self.env[report.model].browse(ids).order_line)
+            recorder.output_size = len(pdf_content or b'')
+        return pdf_content, content_type
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+from .product_template import gd_report_thumbnail
+
+# Campos de la variante que cambian la relación proveedor -> productos
+GD_SUPPLIER_FIELDS = {'active', 'product_tmpl_id'}
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    gd_report_image = fields.Image(
+        string="Imagen para reportes",
+        help="Miniatura de 140px de la imagen de la variante (o de la plantilla) usada en los reportes PDF",
+        compute='_compute_gd_report_image',
+        store=True
+    )
+
+    @api.depends('image_variant_1920', 'product_tmpl_id.gd_report_image')
+    def _compute_gd_report_image(self):
+        thumbs = {}
+        for product in self:
+            if product.image_variant_1920:
+                product.gd_report_image = gd_report_thumbnail(product.image_variant_1920, thumbs)
+            else:
+                product.gd_report_image = product.product_tmpl_id.gd_report_image
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        self.env['gd.supplier.product']._gd_refresh_products(products)
+        return products
+
+    def write(self, vals):
+        if GD_SUPPLIER_FIELDS.intersection(vals):
+            affected = self.with_context(active_test=False)
+            res = super().write(vals)
+            self.env['gd.supplier.product']._gd_refresh_products(affected)
+            return res
+        return super().write(vals)
+
+    def unlink(self):
+        # las filas de gd.supplier.product se eliminan en cascada
+        res = super().unlink()
+        self.env['gd.supplier.product.resolver']._invalidate_cache()
+        return res
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+# Campos de supplierinfo que cambian la relación proveedor -> productos
+GD_SUPPLIER_FIELDS = {'partner_id', 'product_id', 'product_tmpl_id', 'company_id'}
+
+
+class ProductSupplierinfo(models.Model):
+    _inherit = 'product.supplierinfo'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['gd.supplier.product']._gd_rebuild(records.ids)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if GD_SUPPLIER_FIELDS.intersection(vals):
+            self.env['gd.supplier.product']._gd_rebuild(self.ids)
+        return res
+
+    def unlink(self):
+        # las filas de gd.supplier.product se eliminan en cascada
+        res = super().unlink()
+        self.env['gd.supplier.product.resolver']._invalidate_cache()
+        return res
@@ -1,10 +1,52 @@
 # -*- coding: utf-8 -*-
+import base64
+import hashlib
 
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.image import image_process
+
+# Miniatura para reportes PDF (se muestra a 140px en las cotizaciones/OC)
+REPORT_IMAGE_SIZE = 140
+REPORT_IMAGE_QUALITY = 80
+
+
+def gd_report_thumbnail(image, thumbs):
+    """Miniatura de reporte para una imagen base64.
+
+    ``thumbs`` es un dict compartido dentro del lote (checksum -> miniatura)
+    para no procesar dos veces la misma imagen.
+    """
+    if not image:
+        return False
+    raw = image if isinstance(image, bytes) else image.encode()
+    checksum = hashlib.sha1(raw).hexdigest()
+    if checksum not in thumbs:
+        try:
+            thumbs[checksum] = base64.b64encode(image_process(
+                base64.b64decode(raw),
+                size=(REPORT_IMAGE_SIZE, REPORT_IMAGE_SIZE),
+                quality=REPORT_IMAGE_QUALITY,
+            ))
+        except UserError:
+            thumbs[checksum] = False
+    return thumbs[checksum]
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
 
     x_studio_marca = fields.Char(string="Marca", store=True)
 
-#Eliminar todo estooooooooooooo
\ No newline at end of file
+    gd_report_image = fields.Image(
+        string="Imagen para reportes",
+        help="Miniatura de 140px de la imagen del producto usada en los reportes PDF",
+        compute='_compute_gd_report_image',
+        store=True
+    )
+
+    @api.depends('image_1920')
+    def _compute_gd_report_image(self):
+        thumbs = {}
+        for template in self:
+            template.gd_report_image = gd_report_thumbnail(template.image_1920, thumbs)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class PurchaseOrder(models.Model):
+    _inherit = 'purchase.order'
+
+    def _gd_prefetch_report_images(self):
+        """Carga en una sola lectura las miniaturas de reporte de todas las líneas."""
+        products = self.order_line.product_id
+        products.mapped('gd_report_image')
+        return products
+
+
+class ReportPurchaseOrder(models.AbstractModel):
+    _name = 'report.purchase.report_purchaseorder'
+    _description = 'Orden de compra (miniaturas precargadas)'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['purchase.order'].browse(docids)
+        with self.env['gd.report.run']._gd_stage('images'):
+            docs._gd_prefetch_report_images()
+        return {
+            'doc_ids': docids,
+            'doc_model': 'purchase.order',
+            'docs': docs,
+        }
+
+
+class ReportPurchaseQuotation(models.AbstractModel):
+    _name = 'report.purchase.report_purchasequotation'
+    _inherit = 'report.purchase.report_purchaseorder'
+    _description = 'Solicitud de cotización (miniaturas precargadas)'
@@ -3,21 +3,50 @@
 from odoo import models, fields, api
 
 class PurchaseOrderLine(models.Model):
-    _inherit = 'purchase.order.line'
+    _name = 'purchase.order.line'
+    _inherit = ['purchase.order.line', 'gd.line.image.mixin']
 
+    _gd_image_source_field = 'product_id'
+
+    # Imagen mostrada en vistas/reportes: referencia a la imagen 1024 del producto
+    # (no se guarda copia por línea) salvo que exista una copia guardada.
     product_image = fields.Image(
         string="Imagen del Producto",
-        max_width=1024,
-        max_height=1024,
         help="Imagen asociada al producto en esta línea",
         compute='_compute_product_image',
+    )
+
+    # Copia por línea, solo se llena en modo 'copy' (grupodirecto.line_image_mode)
+    product_image_snapshot = fields.Image(
+        string="Imagen guardada",
+        max_width=1024,
+        max_height=1024,
+        copy=False,
+        compute='_compute_product_image_snapshot',
         store=True
     )
 
-    @api.depends('product_id')
+    # Línea creada en modo masivo: la copia la llena el cron después
+    product_image_pending = fields.Boolean(
+        string="Imagen pendiente",
+        copy=False,
+        index=True,
+        compute='_compute_product_image_snapshot',
+        store=True
+    )
+
+    @api.depends('product_id.image_1024', 'product_image_snapshot')
     def _compute_product_image(self):
         for record in self:
-            if record.product_id and record.product_id.image_1920:
-                record.product_image = record.product_id.image_1920
+            record.product_image = record.product_image_snapshot or record.product_id.image_1024
+
+    @api.depends('product_id')
+    def _compute_product_image_snapshot(self):
+        copy_mode = self._gd_line_image_mode() == 'copy'
+        for record in self:
+            if copy_mode and record.product_id and record.product_id.image_1920:
+                record.product_image_snapshot = record.product_id.image_1920
+                record.product_image_pending = False
             else:
-                record.product_image = False
\ No newline at end of file
+                record.product_image_snapshot = False
+                record.product_image_pending = False
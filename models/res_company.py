@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+from .gd_sales_closed_period import GD_SALES_LOCK_FIELDS
+
+
+class ResCompany(models.Model):
+    _inherit = "res.company"
+
+    def write(self, vals):
+        if not any(f in vals for f in GD_SALES_LOCK_FIELDS):
+            return super().write(vals)
+
+        ClosedPeriod = self.env["gd.sales.closed.period"]
+        before = {company.id: ClosedPeriod._gd_lock_date(company) for company in self}
+        res = super().write(vals)
+        for company in self:
+            lock_date = ClosedPeriod._gd_lock_date(company)
+            if before[company.id] and (not lock_date or lock_date < before[company.id]):
+                ClosedPeriod._gd_invalidate_after(company, lock_date)
+        return res
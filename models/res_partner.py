@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields
+from odoo.tools import SQL
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    # Solo para dominios: proveedores con product.supplierinfo en la compañía dada.
+    # Uso: [('gd_supplier_company_id', '=', company_id)]
+    gd_supplier_company_id = fields.Many2one(
+        'res.company',
+        string="Proveedor en compañía",
+        compute='_compute_gd_supplier_company_id',
+        search='_search_gd_supplier_company_id',
+    )
+
+    def _compute_gd_supplier_company_id(self):
+        self.gd_supplier_company_id = False
+
+    def _search_gd_supplier_company_id(self, operator, value):
+        if operator not in ('=', 'in'):
+            raise NotImplementedError(f"Operador no soportado: {operator}")
+        company_ids = list(value) if isinstance(value, (list, tuple)) else [value]
+        # Subconsulta sobre la tabla mantenida (índice por partner/compañía)
+        return [('id', 'in', SQL(
+            "SELECT sp.partner_id FROM gd_supplier_product sp"
+            " WHERE sp.company_id IS NULL OR sp.company_id = ANY(%s)",
+            [company_id or None for company_id in company_ids],
+        ))]
@@ -19,15 +19,40 @@ class SaleOrder(models.Model):
     #         }
     #     }
 
-    def get_discount(self):
-        undiscounted_price = 0
-        total_discount = 0
-        discount = False
+    # Totales de descuento para la "Cotización Bazzar" (se guardan y solo se
+    # recalculan cuando cambian las líneas, el reporte los lee directo)
+    gd_has_discount = fields.Boolean(
+        string="Tiene descuento",
+        compute='_compute_gd_discount',
+        store=True
+    )
+    gd_amount_undiscounted = fields.Float(
+        string="Subtotal sin descuento",
+        compute='_compute_gd_discount',
+        store=True
+    )
+    gd_discount_total = fields.Float(
+        string="Descuento total (%)",
+        compute='_compute_gd_discount',
+        store=True
+    )
+
+    @api.depends('order_line.product_uom_qty', 'order_line.price_unit', 'order_line.discount')
+    def _compute_gd_discount(self):
         for order in self:
+            undiscounted_price = 0.0
+            total_discount = 0.0
             for line in order.order_line:
                 undiscounted_price += line.product_uom_qty * line.price_unit
                 total_discount += line.discount
-                if discount == False and line.discount:
-                    discount = True
-        print(f"undiscount_price {undiscounted_price} y total_discount {total_discount}")
-        return [discount, undiscounted_price, total_discount]
\ No newline at end of file
+            order.gd_amount_undiscounted = undiscounted_price
+            order.gd_discount_total = total_discount
+            order.gd_has_discount = any(order.order_line.mapped('discount'))
+
+    def get_discount(self):
+        """Compatibilidad: [tiene_descuento, subtotal_sin_descuento, descuento_total]."""
+        return [
+            any(self.mapped('gd_has_discount')),
+            sum(self.mapped('gd_amount_undiscounted')),
+            sum(self.mapped('gd_discount_total')),
+        ]
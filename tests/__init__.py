@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_gd_sales
+from . import test_gd_stock_snapshot
+from . import test_gd_report_cache
+from . import test_gd_sales_ranking
+from . import test_gd_report_job
+from . import test_gd_supplier_product
+from . import test_gd_stock_move_rule
+from . import test_gd_sales_closed_period
+from . import test_gd_sales_monthly
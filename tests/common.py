@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class GdSalesCommon(AccountTestInvoicingCommon):
+    """Compañía con plan contable, productos y facturas de cliente de prueba."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.company_data["company"]
+        cls.date_from = "2024-03-01"
+        cls.date_to = "2024-03-31"
+
+    @classmethod
+    def _gd_product(cls, name, **vals):
+        return cls.env["product.product"].create(dict({"name": name, "list_price": 10.0}, **vals))
+
+    @classmethod
+    def _gd_storable_product(cls, name):
+        vals = {"type": "consu"}
+        if "is_storable" in cls.env["product.product"]._fields:
+            vals["is_storable"] = True
+        else:
+            vals["type"] = "product"
+        return cls._gd_product(name, **vals)
+
+    @classmethod
+    def _gd_vendor(cls, name, products):
+        vendor = cls.env["res.partner"].create({"name": name})
+        cls.env["product.supplierinfo"].create([
+            {"partner_id": vendor.id, "product_tmpl_id": product.product_tmpl_id.id}
+            for product in products
+        ])
+        return vendor
+
+    def _gd_invoice(self, move_type, product, quantity, price_unit, date="2024-03-10"):
+        move = self.env["account.move"].create({
+            "move_type": move_type,
+            "partner_id": self.partner_a.id,
+            "invoice_date": date,
+            "date": date,
+            "invoice_line_ids": [Command.create({
+                "product_id": product.id,
+                "quantity": quantity,
+                "price_unit": price_unit,
+                "tax_ids": [Command.clear()],
+            })],
+        })
+        move.action_post()
+        return move
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+
+@tagged("post_install", "-at_install")
+class TestGdReportCache(GdSalesCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product = cls._gd_storable_product("GD caché")
+        cls.vendor = cls._gd_vendor("GD proveedor", cls.product)
+
+    def _gd_wizard(self, **vals):
+        return self.env["gd.top.productos.proveedor.wizard"].create(dict({
+            "company_id": self.company.id,
+            "supplier_id": self.vendor.id,
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+        }, **vals))
+
+    def _gd_report_file(self, wizard):
+        return self.env["ir.attachment"].create({
+            "name": "gd_test.xlsx",
+            "raw": b"gd",
+            "res_model": wizard._name,
+            "res_id": 0,
+        })
+
+    def _gd_touch(self, table, ids):
+        # Simula una transacción posterior (en la misma transacción write_date no cambia)
+        self.env.cr.execute(
+            f"UPDATE {table} SET write_date = write_date + interval '1 second' WHERE id IN %s",
+            [tuple(ids)],
+        )
+
+    def test_move_line_change_invalidates(self):
+        invoice = self._gd_invoice("out_invoice", self.product, 5, 10.0)
+        wizard = self._gd_wizard()
+        Cache = self.env["gd.report.cache"]
+        key = Cache._gd_key(wizard._name, wizard._gd_job_params())
+        watermark = wizard._gd_cache_watermark()
+        attachment = self._gd_report_file(wizard)
+        Cache._gd_store(key, watermark, wizard._name, self.company, attachment)
+        self.assertEqual(Cache._gd_lookup(key, wizard._gd_cache_watermark()), attachment)
+
+        self._gd_touch("account_move_line", invoice.invoice_line_ids.ids)
+        new_watermark = wizard._gd_cache_watermark()
+        self.assertNotEqual(new_watermark, watermark)
+        self.assertFalse(Cache._gd_lookup(key, new_watermark))
+
+    def test_stock_change_invalidates_only_in_stock(self):
+        stock_location = self.env["stock.warehouse"].search(
+            [("company_id", "=", self.company.id)], limit=1
+        ).lot_stock_id
+        self.env["stock.quant"]._update_available_quantity(self.product, stock_location, 3.0)
+        quants = self.env["stock.quant"].search([("product_id", "=", self.product.id)])
+        in_stock = self._gd_wizard(order_mode="bottom", only_in_stock=True)
+        top = self._gd_wizard()
+        watermarks = (in_stock._gd_cache_watermark(), top._gd_cache_watermark())
+
+        self._gd_touch("stock_quant", quants.ids)
+        self.assertNotEqual(in_stock._gd_cache_watermark(), watermarks[0])
+        self.assertEqual(top._gd_cache_watermark(), watermarks[1])
+
+    def test_evict_keeps_referenced_files(self):
+        wizard = self._gd_wizard()
+        Cache = self.env["gd.report.cache"]
+        attachment = self._gd_report_file(wizard)
+        wizard.gd_attachment_id = attachment
+        Cache._gd_store("gd-test", "w1", wizard._name, self.company, attachment)
+
+        self.env["ir.config_parameter"].set_param("grupodirecto.report_cache_max_mb", 0)
+        Cache._gd_evict()
+        self.assertFalse(Cache.search([("key", "=", "gd-test")]))
+        self.assertTrue(attachment.exists(), "El wizard todavía usa el archivo")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+
+@tagged("post_install", "-at_install")
+@unittest.skipUnless(xlsxwriter, "xlsxwriter no está instalado")
+class TestGdReportJob(GdSalesCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env.user.groups_id |= cls.env.ref("sales_team.group_sale_manager")
+        cls.product = cls._gd_product("GD segundo plano")
+        cls.vendor = cls._gd_vendor("GD proveedor", cls.product)
+        cls.idle_vendor = cls._gd_vendor("GD proveedor sin ventas", cls._gd_product("GD sin ventas"))
+        cls.Job = cls.env["gd.report.job"]
+
+    def setUp(self):
+        super().setUp()
+        # Los trabajos corren en cursores propios: en modo test comparten la transacción
+        self.registry.enter_test_mode(self.env.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self._gd_invoice("out_invoice", self.product, 5, 10.0)
+
+    def _gd_queue(self, vendor=None, **vals):
+        wizard = self.env["gd.top.productos.proveedor.wizard"].create(dict({
+            "company_id": self.company.id,
+            "supplier_id": (vendor or self.vendor).id,
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+        }, **vals))
+        wizard.action_send_to_background()
+        return self.Job.search([("report_model", "=", wizard._name)], limit=1)
+
+    def test_cron_runs_queued_job(self):
+        job = self._gd_queue()
+        self.assertEqual(job.state, "queued")
+
+        self.Job._gd_cron_run_jobs()
+        job.invalidate_recordset()
+        self.assertEqual(job.state, "done", job.error)
+        self.assertEqual(job.progress, 100.0)
+        self.assertTrue(job.attachment_id.raw.startswith(b"PK"))
+        self.assertEqual(job._gd_download_url(), f"/grupodirecto/report/{job.attachment_id.id}")
+
+    def test_limit_per_report_type(self):
+        self.env["ir.config_parameter"].set_param(
+            "grupodirecto.report_job_limit.gd.top.productos.proveedor.wizard", 1
+        )
+        first = self._gd_queue()
+        second = self._gd_queue(order_mode="bottom")
+
+        self.Job._gd_cron_run_jobs()
+        (first | second).invalidate_recordset()
+        self.assertEqual((first.state, second.state), ("done", "queued"))
+
+        self.Job._gd_cron_run_jobs()
+        second.invalidate_recordset()
+        self.assertEqual(second.state, "done", second.error)
+
+    def test_failed_job_keeps_error(self):
+        job = self._gd_queue(vendor=self.idle_vendor)
+        self.Job._gd_cron_run_jobs()
+        job.invalidate_recordset()
+        self.assertEqual(job.state, "failed")
+        self.assertTrue(job.error)
+        self.assertFalse(job.attachment_id)
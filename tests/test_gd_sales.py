@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+
+@tagged("post_install", "-at_install")
+class TestGdSales(GdSalesCommon):
+
+    def test_net_sales_with_refunds(self):
+        product = self._gd_product("GD neto")
+        self._gd_invoice("out_invoice", product, 5, 10.0)
+        refund = self._gd_invoice("out_refund", product, 2, 10.0)
+        # Fuera del periodo: no cuenta
+        self._gd_invoice("out_invoice", product, 7, 10.0, date="2024-04-02")
+
+        Aggregator = self.env["gd.sales.aggregator"]
+        sales = Aggregator._get_net_sales(self.company.id, [product.id], [(self.date_from, self.date_to)])
+        self.assertEqual(sales[product.id], (3.0, 30.0))
+        self.assertEqual(
+            sales,
+            Aggregator._get_net_sales_live(self.company.id, [product.id], [(self.date_from, self.date_to)]),
+        )
+
+        # La nota de crédito vuelta a borrador deja de restar
+        refund.button_draft()
+        sales = Aggregator._get_net_sales(self.company.id, [product.id], [(self.date_from, self.date_to)])
+        self.assertEqual(sales[product.id], (5.0, 50.0))
+
+    def test_concurrent_keys_are_upserted(self):
+        # Dos facturas del mismo producto y día: una sola fila diaria con la suma
+        product = self._gd_product("GD misma clave")
+        self._gd_invoice("out_invoice", product, 1, 10.0)
+        self._gd_invoice("out_invoice", product, 2, 10.0)
+        rows = self.env["gd.sales.daily"].search([("product_id", "=", product.id)])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows.quantity, rows.amount), (3.0, 30.0))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+
+@tagged("post_install", "-at_install")
+class TestGdSalesClosedPeriod(GdSalesCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product = cls._gd_product("GD periodo cerrado")
+
+    def _gd_periods(self):
+        return self.env["gd.sales.closed.period"].search([
+            ("company_id", "=", self.company.id),
+            ("date_from", "=", self.date_from),
+            ("date_to", "=", self.date_to),
+        ])
+
+    def _gd_sales(self):
+        return self.env["gd.sales.aggregator"]._get_net_sales(
+            self.company.id, [self.product.id], [(self.date_from, self.date_to)]
+        )[self.product.id]
+
+    def _gd_force_lock_date(self, lock_date):
+        # Sin pasar por write(): simula una excepción de bloqueo
+        self.env.cr.execute(
+            "UPDATE res_company SET sale_lock_date = %s WHERE id = %s", [lock_date, self.company.id]
+        )
+        self.company.invalidate_recordset(["sale_lock_date"])
+
+    def test_period_computed_once_when_closed(self):
+        self._gd_invoice("out_invoice", self.product, 4, 10.0)
+        self._gd_sales()
+        self.assertFalse(self._gd_periods())
+
+        self.company.sale_lock_date = self.date_to
+        self.assertEqual(self._gd_sales(), (4.0, 40.0))
+        period = self._gd_periods()
+        self.assertEqual(len(period), 1)
+        self.assertEqual(period.lock_date, fields.Date.to_date(self.date_to))
+        self.assertEqual(period.line_ids.filtered(lambda l: l.product_id == self.product).quantity, 4.0)
+
+        # Segunda lectura: mismo periodo, sin recalcular
+        self.assertEqual(self._gd_sales(), (4.0, 40.0))
+        self.assertEqual(self._gd_periods(), period)
+
+    def test_lock_date_moved_back_discards_periods(self):
+        self._gd_invoice("out_invoice", self.product, 4, 10.0)
+        self.company.sale_lock_date = self.date_to
+        self._gd_sales()
+        self.assertTrue(self._gd_periods())
+
+        # Avanzar el bloqueo no descarta nada
+        self.company.sale_lock_date = "2024-04-30"
+        self.assertTrue(self._gd_periods())
+
+        # Retroceder antes del fin del periodo sí
+        self.company.sale_lock_date = "2024-03-15"
+        self.assertFalse(self._gd_periods())
+
+        self.company.sale_lock_date = self.date_to
+        self._gd_sales()
+        self.assertTrue(self._gd_periods())
+        self.company.sale_lock_date = False
+        self.assertFalse(self._gd_periods())
+
+    def test_move_posted_in_closed_period(self):
+        self._gd_invoice("out_invoice", self.product, 4, 10.0)
+        self.company.sale_lock_date = self.date_to
+        self.assertEqual(self._gd_sales(), (4.0, 40.0))
+        self.assertTrue(self._gd_periods())
+
+        self._gd_force_lock_date(False)
+        self._gd_invoice("out_refund", self.product, 1, 10.0, date="2024-03-20")
+        self.assertFalse(self._gd_periods())
+
+        self._gd_force_lock_date(self.date_to)
+        self.assertEqual(self._gd_sales(), (3.0, 30.0))
+        self.assertTrue(self._gd_periods())
+
+    def test_move_posted_outside_periods_keeps_them(self):
+        self._gd_invoice("out_invoice", self.product, 4, 10.0)
+        self.company.sale_lock_date = self.date_to
+        self._gd_sales()
+        period = self._gd_periods()
+
+        self._gd_invoice("out_invoice", self.product, 2, 10.0, date="2024-04-05")
+        self.assertEqual(self._gd_periods(), period)
+        self.assertEqual(self._gd_sales(), (4.0, 40.0))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+
+@tagged("post_install", "-at_install")
+class TestGdSalesMonthly(GdSalesCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product_a = cls._gd_product("GD mensual A")
+        cls.product_b = cls._gd_product("GD mensual B")
+        cls.vendor = cls._gd_vendor("GD proveedor mensual", cls.product_a | cls.product_b)
+        # Rango actual con meses parciales; el de comparación se solapa en marzo
+        cls.ranges = [("2024-03-05", "2024-04-30"), ("2024-02-01", "2024-03-15")]
+
+    def _gd_post_sales(self):
+        self._gd_invoice("out_invoice", self.product_a, 4, 10.0, date="2024-03-02")
+        self._gd_invoice("out_invoice", self.product_a, 5, 10.0, date="2024-03-10")
+        self._gd_invoice("out_invoice", self.product_a, 2, 10.0, date="2024-04-05")
+        self._gd_invoice("out_refund", self.product_a, 1, 10.0, date="2024-04-20")
+        self._gd_invoice("out_invoice", self.product_b, 3, 10.0, date="2024-02-14")
+        self._gd_invoice("out_invoice", self.product_b, 7, 10.0, date="2024-01-31")
+
+    def test_monthly_pivot(self):
+        self._gd_post_sales()
+        buckets, sales = self.env["gd.sales.aggregator"]._get_net_sales_monthly(
+            self.company.id, [self.product_a.id, self.product_b.id], self.ranges
+        )
+        self.assertEqual(buckets, [
+            (0, date(2024, 3, 1)),
+            (0, date(2024, 4, 1)),
+            (1, date(2024, 2, 1)),
+            (1, date(2024, 3, 1)),
+        ])
+        # Marzo del rango actual empieza el 05: la venta del 02 solo cuenta al comparar
+        self.assertEqual(list(sales[self.product_a.id]), [5.0, 50.0, 1.0, 10.0, 0.0, 0.0, 9.0, 90.0])
+        self.assertEqual(list(sales[self.product_b.id]), [0.0, 0.0, 0.0, 0.0, 3.0, 30.0, 0.0, 0.0])
+
+    def test_monthly_matches_ranges(self):
+        # La suma de los meses de cada rango es el total del rango
+        self._gd_post_sales()
+        Aggregator = self.env["gd.sales.aggregator"]
+        product_ids = [self.product_a.id, self.product_b.id]
+        buckets, sales = Aggregator._get_net_sales_monthly(self.company.id, product_ids, self.ranges)
+        totals = Aggregator._get_net_sales(self.company.id, product_ids, self.ranges)
+        for pid in product_ids:
+            expected = [0.0] * 4
+            for col, (idx, _month) in enumerate(buckets):
+                expected[2 * idx] += sales[pid][2 * col]
+                expected[2 * idx + 1] += sales[pid][2 * col + 1]
+            self.assertEqual(tuple(expected), totals[pid])
+
+    def test_no_products(self):
+        buckets, sales = self.env["gd.sales.aggregator"]._get_net_sales_monthly(
+            self.company.id, [], self.ranges
+        )
+        self.assertEqual(len(buckets), 4)
+        self.assertEqual(sales, {})
+
+    def test_libro_monthly_groups(self):
+        self._gd_post_sales()
+        wizard = self.env["gd.libro.inventario.comparativo.wizard"].create({
+            "company_id": self.company.id,
+            "supplier_id": self.vendor.id,
+            "period_mode": "monthly",
+            "date_from_current": self.ranges[0][0],
+            "date_to_current": self.ranges[0][1],
+            "date_from_compare": self.ranges[1][0],
+            "date_to_compare": self.ranges[1][1],
+        })
+        groups, sales = wizard._get_monthly_sales(wizard._get_product_ids_for_supplier(), self.ranges)
+        self.assertEqual(groups, ["Actual 03/2024", "Actual 04/2024", "Comparar 02/2024", "Comparar 03/2024"])
+        self.assertEqual(set(sales), {self.product_a.id, self.product_b.id})
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import GdSalesCommon
+
+
+@tagged("post_install", "-at_install")
+class TestGdSalesRanking(GdSalesCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.best = cls._gd_storable_product("GD más vendido")
+        cls.few = cls._gd_storable_product("GD poco vendido")
+        cls.never = cls._gd_storable_product("GD nunca vendido")
+        cls.product_ids = [cls.best.id, cls.few.id, cls.never.id]
+
+    def setUp(self):
+        super().setUp()
+        self._gd_invoice("out_invoice", self.best, 5, 10.0)
+        self._gd_invoice("out_invoice", self.few, 2, 10.0)
+
+    def _gd_rank(self, limit, **kwargs):
+        return self.env["gd.sales.aggregator"]._get_ranked_net_sales(
+            self.company.id, self.product_ids, self.date_from, self.date_to, limit, **kwargs
+        )
+
+    def test_top_ranking(self):
+        self.assertEqual(self._gd_rank(1), [(self.best.id, 5.0, 50.0)])
+        self.assertEqual(self._gd_rank(5), [(self.best.id, 5.0, 50.0), (self.few.id, 2.0, 20.0)])
+
+    def test_bottom_ranking_sold_only(self):
+        self.assertEqual([r[0] for r in self._gd_rank(2, descending=False)], [self.few.id, self.best.id])
+
+    def test_bottom_ranking_includes_unsold(self):
+        self.assertEqual(
+            self._gd_rank(2, descending=False, include_unsold=True),
+            [(self.never.id, 0.0, 0.0), (self.few.id, 2.0, 20.0)],
+        )
+
+    def test_bottom_ranking_only_in_stock(self):
+        stock_location = self.env["stock.warehouse"].search(
+            [("company_id", "=", self.company.id)], limit=1
+        ).lot_stock_id
+        self.env["stock.quant"]._update_available_quantity(self.best, stock_location, 4.0)
+        self.assertEqual(
+            self._gd_rank(3, descending=False, include_unsold=True, only_in_stock=True),
+            [(self.best.id, 5.0, 50.0)],
+        )
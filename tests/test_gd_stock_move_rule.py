@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestGdStockMoveRule(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.warehouse = cls.env["stock.warehouse"].search(
+            [("company_id", "=", cls.company.id)], limit=1
+        )
+        cls.stock_location = cls.warehouse.lot_stock_id
+        cls.cojines_location = cls.env["stock.location"].create({
+            "name": "GD cojines",
+            "usage": "internal",
+            "location_id": cls.stock_location.id,
+        })
+        cls.shelf_location = cls.env["stock.location"].create({
+            "name": "GD estante",
+            "usage": "internal",
+            "location_id": cls.cojines_location.id,
+        })
+        cls.supplier_location = cls.env.ref("stock.stock_location_suppliers")
+        cls.customer_location = cls.env.ref("stock.stock_location_customers")
+        cls.out_type = cls.warehouse.out_type_id
+
+        Rule = cls.env["gd.stock.move.rule"]
+        cls.rule_cojines = Rule.create({
+            "name": "GD salida cojines",
+            "sequence": 1,
+            "bucket": "salida_cojines",
+            "src_location_ids": [(6, 0, cls.cojines_location.ids)],
+            "dest_usage": "customer",
+        })
+        cls.rule_compras = Rule.create({
+            "name": "GD compras",
+            "sequence": 10,
+            "bucket": "compras",
+            "src_usage": "supplier",
+            "dest_usage": "internal",
+        })
+        cls.rule_ventas = Rule.create({
+            "name": "GD ventas",
+            "sequence": 30,
+            "bucket": "ventas",
+            "src_usage": "internal",
+            "dest_usage": "customer",
+            "picking_type_ids": [(6, 0, cls.out_type.ids)],
+        })
+        cls.rules = cls.rule_cojines | cls.rule_compras | cls.rule_ventas
+
+    def test_first_matching_rule_wins(self):
+        stock, shelf = self.stock_location.id, self.shelf_location.id
+        supplier, customer = self.supplier_location.id, self.customer_location.id
+        out_type = self.out_type.id
+        res = self.rules._gd_classify([
+            (1, supplier, stock, False, 5.0),
+            (1, supplier, shelf, False, 2.0),
+            # desde una hija de cojines: cae en la regla de menor secuencia
+            (2, shelf, customer, out_type, 3.0),
+            (2, stock, customer, out_type, 4.0),
+            # sin el tipo de operación de la regla de ventas: no se clasifica
+            (3, stock, customer, False, 7.0),
+            (3, customer, stock, False, 1.0),
+        ])
+        self.assertEqual(res["compras"], {1: 7.0})
+        self.assertEqual(res["salida_cojines"], {2: 3.0})
+        self.assertEqual(res["ventas"], {2: 4.0})
+        self.assertEqual(res["devoluciones"], {})
+
+    def test_sequence_change_reclassifies(self):
+        group = (2, self.shelf_location.id, self.customer_location.id, self.out_type.id, 3.0)
+        self.rule_cojines.sequence = 50
+        res = self.rules.sorted()._gd_classify([group])
+        self.assertEqual(res["ventas"], {2: 3.0})
+        self.assertEqual(res["salida_cojines"], {})
+
+    def test_rules_by_company(self):
+        other_company = self.env["res.company"].create({"name": "GD otra compañía"})
+        other_rule = self.env["gd.stock.move.rule"].create({
+            "name": "GD otra compañía",
+            "bucket": "compras",
+            "company_id": other_company.id,
+        })
+        rules = self.env["gd.stock.move.rule"]._gd_get_rules(self.company.id)
+        self.assertLessEqual(self.rules, rules)
+        self.assertNotIn(other_rule, rules)
+        self.assertIn(other_rule, self.env["gd.stock.move.rule"]._gd_get_rules(other_company.id))
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestGdStockSnapshot(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.stock_location = cls.env["stock.warehouse"].search(
+            [("company_id", "=", cls.company.id)], limit=1
+        ).lot_stock_id
+        vals = {"name": "GD foto de stock", "type": "consu"}
+        if "is_storable" in cls.env["product.product"]._fields:
+            vals["is_storable"] = True
+        else:
+            vals["type"] = "product"
+        cls.product = cls.env["product.product"].create(vals)
+
+    def test_retake_after_quants_disappear(self):
+        Quant = self.env["stock.quant"]
+        Snapshot = self.env["gd.stock.snapshot"]
+        Quant._update_available_quantity(self.product, self.stock_location, 10.0)
+        at = fields.Datetime.now()
+
+        Snapshot._gd_take_snapshot(self.company.id, at)
+        stock = Snapshot._get_stock_at(self.company.id, [self.product.id], at)
+        self.assertEqual(stock[self.product.id], 10.0)
+
+        Quant._update_available_quantity(self.product, self.stock_location, -10.0)
+        Quant._quant_tasks()
+        self.assertFalse(Quant.search([("product_id", "=", self.product.id)]))
+
+        Snapshot._gd_take_snapshot(self.company.id, at)
+        self.assertFalse(Snapshot.search([
+            ("company_id", "=", self.company.id),
+            ("product_id", "=", self.product.id),
+            ("snapshot_at", "=", at),
+        ]))
+        stock = Snapshot._get_stock_at(self.company.id, [self.product.id], at)
+        self.assertEqual(stock[self.product.id], 0.0)
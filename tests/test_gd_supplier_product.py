@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestGdSupplierProduct(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.vendor = cls.env["res.partner"].create({"name": "GD proveedor variantes"})
+        attribute = cls.env["product.attribute"].create({
+            "name": "GD color",
+            "value_ids": [Command.create({"name": "Rojo"}), Command.create({"name": "Azul"})],
+        })
+        cls.template = cls.env["product.template"].create({
+            "name": "GD con variantes",
+            "attribute_line_ids": [Command.create({
+                "attribute_id": attribute.id,
+                "value_ids": [Command.set(attribute.value_ids.ids)],
+            })],
+        })
+        cls.red, cls.blue = cls.template.product_variant_ids
+        cls.Resolver = cls.env["gd.supplier.product.resolver"]
+
+    def _gd_products(self, **kwargs):
+        return set(self.Resolver._get_product_ids(self.company.id, self.vendor.id, **kwargs))
+
+    def test_variant_supplierinfo(self):
+        self.env["product.supplierinfo"].create({
+            "partner_id": self.vendor.id,
+            "product_tmpl_id": self.template.id,
+            "product_id": self.red.id,
+        })
+        self.assertEqual(self._gd_products(), {self.red.id})
+        # El stock con imagen trae todas las variantes de la plantilla
+        self.assertEqual(self._gd_products(whole_templates=True), {self.red.id, self.blue.id})
+
+    def _gd_rows(self, vendor=None):
+        return set(self.env["gd.supplier.product"].search([
+            ("partner_id", "=", (vendor or self.vendor).id),
+        ]).product_id.ids)
+
+    def test_template_supplierinfo_follows_variants(self):
+        self.env["product.supplierinfo"].create({
+            "partner_id": self.vendor.id,
+            "product_tmpl_id": self.template.id,
+        })
+        self.assertEqual(self._gd_rows(), {self.red.id, self.blue.id})
+
+        self.blue.active = False
+        self.assertEqual(self._gd_rows(), {self.red.id})
+        self.assertEqual(self._gd_products(), {self.red.id})
+
+        self.blue.active = True
+        self.assertEqual(self._gd_rows(), {self.red.id, self.blue.id})
+
+    def test_supplierinfo_write_and_unlink(self):
+        other = self.env["res.partner"].create({"name": "GD otro proveedor"})
+        seller = self.env["product.supplierinfo"].create({
+            "partner_id": self.vendor.id,
+            "product_tmpl_id": self.template.id,
+            "product_id": self.red.id,
+        })
+        seller.partner_id = other
+        self.assertFalse(self._gd_rows())
+        self.assertEqual(self._gd_rows(other), {self.red.id})
+        self.assertFalse(self._gd_products())
+
+        seller.unlink()
+        self.assertFalse(self._gd_rows(other))
+        self.assertFalse(self.Resolver._get_product_ids(self.company.id, other.id))
+
+    def test_rebuild_matches_incremental(self):
+        self.env["product.supplierinfo"].create({
+            "partner_id": self.vendor.id,
+            "product_tmpl_id": self.template.id,
+        })
+        before = self._gd_rows()
+        self.env["gd.supplier.product"]._gd_rebuild()
+        self.assertEqual(self._gd_rows(), before)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
+from . import gd_report_wizard_mixin
 from . import gd_top_productos_proveedor_wizard
 from . import gd_libro_inventario_comparativo_wizard
 from . import gd_resumen_inventario_wizard
-from . import gd_stock_por_img_wizard
\ No newline at end of file
+from . import gd_stock_por_img_wizard
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# A partir de cuántas filas (estimadas) se usa el modo exportación grande; 0 = nunca
+LARGE_EXPORT_ROWS_PARAM = "grupodirecto.xlsx_large_export_rows"
+LARGE_EXPORT_ROWS_DEFAULT = 20000
+
+# Días que se conservan los archivos generados (ir.attachment sin registro)
+REPORT_FILE_RETENTION_PARAM = "grupodirecto.report_file_retention_days"
+REPORT_FILE_RETENTION_DEFAULT = 7
+
+
+class GdReportWizardMixin(models.AbstractModel):
+    """Utilidades comunes de los reportes Excel (workbook y guardado del archivo).
+
+    Modo normal: workbook en memoria (BytesIO).
+    Modo exportación grande: xlsxwriter con ``constant_memory`` sobre un archivo
+    temporal; las filas se escriben a medida que llegan (en orden) y el archivo
+    final se mueve al filestore sin pasar por un string base64.
+
+    El archivo queda como ir.attachment propio (res_model = wizard, sin res_id,
+    así no lo borra el vacuum de transitorios) y se descarga por
+    /grupodirecto/report/<id> (Content-Length, ETag y Range).
+    """
+    _name = "gd.report.wizard.mixin"
+    _description = "GD - Utilidades comunes de reportes Excel"
+
+    gd_attachment_id = fields.Many2one("ir.attachment", string="Archivo", readonly=True, ondelete="set null")
+    gd_diagnostics = fields.Boolean(
+        string="Modo diagnóstico",
+        help="Registra consultas, tiempos y planes (EXPLAIN) de esta corrida en GD - Diagnóstico de reporte. "
+             "Ignora la caché de resultados.",
+    )
+
+    # Tablas (con product_id) cuyo último cambio invalida el resultado en caché
+    _gd_watermark_tables = ()
+
+    def write(self, vals):
+        # Cambiar cualquier parámetro invalida el archivo ya generado
+        if set(vals) - {"gd_attachment_id"}:
+            vals = dict(vals, gd_attachment_id=False)
+        return super().write(vals)
+
+    # -------------------------
+    # Acción principal
+    # -------------------------
+    def action_download_excel(self):
+        self.ensure_one()
+        self._gd_get_or_generate()
+        return self._gd_download_action()
+
+    def _gd_get_or_generate(self):
+        """Devuelve el archivo del reporte: el ya generado, el de la caché o uno nuevo.
+
+        Cada corrida queda registrada en gd.report.run (telemetría).
+        """
+        self.ensure_one()
+        if self.gd_attachment_id:
+            return self.gd_attachment_id
+
+        params = self._gd_job_params()
+        with self.env["gd.report.run"]._gd_record(
+            self._description, self._name, "xlsx", params, self.company_id
+        ) as recorder:
+            wizard = self.with_context(gd_report_run_key=recorder.key)
+            attachment = wizard._gd_resolve_attachment(params, recorder)
+            recorder.output_size = attachment.file_size
+        return attachment
+
+    def _gd_resolve_attachment(self, params, recorder):
+        Diagnostic = self.env["gd.report.diagnostic"]
+        if Diagnostic._gd_is_enabled(self):
+            Diagnostic._gd_run(self, lambda wizard: wizard._gd_generate_report())
+            return self.gd_attachment_id
+
+        Cache = self.env["gd.report.cache"].sudo()
+        key = Cache._gd_key(self._name, params)
+        watermark = self._gd_cache_watermark()
+        attachment = Cache._gd_lookup(key, watermark)
+        if attachment:
+            recorder.from_cache = True
+            self.write({"gd_attachment_id": attachment.id})
+            return attachment
+
+        self._gd_generate_report()
+        Cache._gd_store(key, watermark, self._name, self.company_id, self.gd_attachment_id)
+        return self.gd_attachment_id
+
+    def _gd_cache_watermark(self):
+        """Marca de agua de los datos que lee el reporte.
+
+        Productos del proveedor, último cambio de su supplierinfo y, por cada
+        tabla de ``_gd_watermark_tables``, el último write_date de esos productos.
+        """
+        self.ensure_one()
+        product_ids = sorted(self._gd_watermark_product_ids())
+        parts = [hashlib.sha1(repr(product_ids).encode()).hexdigest()]
+
+        self.env.cr.execute(
+            "SELECT max(write_date) FROM product_supplierinfo WHERE partner_id = %s",
+            [self.supplier_id.id],
+        )
+        parts.append(str(self.env.cr.fetchone()[0] or ""))
+
+        Cache = self.env["gd.report.cache"]
+        for table in self._gd_watermark_tables:
+            parts.append(Cache._gd_product_watermark(table, product_ids))
+        return ";".join(parts)
+
+    def _gd_watermark_product_ids(self):
+        """Productos cuyos cambios invalidan el resultado (los del proveedor)."""
+        return self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id
+        )
+
+    def _gd_generate_report(self):
+        """Implementado por cada wizard: arma el Excel y llama a _gd_store_file."""
+        raise NotImplementedError()
+
+    def action_send_to_background(self):
+        """Encola el reporte (gd.report.job); se avisa por el bus al terminar."""
+        self.ensure_one()
+        self.env["gd.report.job"]._gd_enqueue(self)
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "info",
+                "title": _("Reporte en segundo plano"),
+                "message": _("Se le avisará cuando el archivo esté listo (Reportes Grupo Directo > Mis reportes)."),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    def _gd_job_params(self):
+        """Parámetros del wizard serializables a JSON (para recrearlo en el trabajo)."""
+        self.ensure_one()
+        params = {}
+        for name, field in self._fields.items():
+            if not field.store or field.automatic or name == "gd_attachment_id":
+                continue
+            value = self[name]
+            if field.type == "many2one":
+                value = value.id
+            elif field.type in ("many2many", "one2many"):
+                value = [(6, 0, value.ids)]
+            elif field.type == "date":
+                value = fields.Date.to_string(value)
+            elif field.type == "datetime":
+                value = fields.Datetime.to_string(value)
+            params[name] = value
+        return params
+
+    # -------------------------
+    # Telemetría (gd.report.run)
+    # -------------------------
+    def _gd_stage(self, name):
+        """Context manager que mide una etapa (suppliers, aggregation, stock, images, xlsx, encoding)."""
+        return self.env["gd.report.run"]._gd_stage(name)
+
+    def _gd_timed_iter(self, iterable, stage):
+        """Itera ``iterable`` contando a ``stage`` solo el tiempo de producir cada elemento."""
+        iterator = iter(iterable)
+        while True:
+            with self._gd_stage(stage):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def _gd_run_rows(self, count):
+        recorder = self.env["gd.report.run"]._gd_recorder()
+        if recorder:
+            recorder.row_count = count
+
+    def _gd_report_progress(self, progress, message=None):
+        """Informa el avance cuando el reporte corre como gd.report.job."""
+        job_id = self.env.context.get("gd_report_job_id")
+        if job_id:
+            self.env["gd.report.job"]._gd_set_progress(job_id, progress, message)
+
+    @api.model
+    def _gd_report_models(self):
+        return set(self.env.registry["gd.report.wizard.mixin"]._inherit_children)
+
+    # -------------------------
+    # Workbook
+    # -------------------------
+    @api.model
+    def _gd_is_large_export(self, estimated_rows):
+        ICP = self.env["ir.config_parameter"].sudo()
+        try:
+            threshold = int(ICP.get_param(LARGE_EXPORT_ROWS_PARAM, LARGE_EXPORT_ROWS_DEFAULT))
+        except (TypeError, ValueError):
+            threshold = LARGE_EXPORT_ROWS_DEFAULT
+        return threshold > 0 and (estimated_rows or 0) >= threshold
+
+    @api.model
+    def _gd_new_workbook(self, estimated_rows=0):
+        """Devuelve (workbook, destino).
+
+        ``destino`` es un BytesIO (modo normal) o la ruta del archivo temporal
+        (modo exportación grande). En modo grande las filas deben escribirse en
+        orden: lo ya escrito de una fila se vuelca a disco al pasar a la siguiente.
+        """
+        if self._gd_is_large_export(estimated_rows):
+            fd, path = tempfile.mkstemp(prefix="gd_report_", suffix=".xlsx")
+            os.close(fd)
+            _logger.info("[GD_XLSX] modo exportación grande (%s filas estimadas): %s", estimated_rows, path)
+            wb = xlsxwriter.Workbook(path, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+            return wb, path
+
+        output = io.BytesIO()
+        return xlsxwriter.Workbook(output, {"in_memory": True}), output
+
+    # -------------------------
+    # Guardado
+    # -------------------------
+    @api.model
+    def _gd_attachment_vals(self, target):
+        """Valores de ir.attachment para el archivo generado en ``target``.
+
+        Con filestore en disco, el archivo temporal se mueve directo a su ruta
+        final (checksum calculado por bloques); nunca se arma el base64 completo.
+        El archivo queda marcado para el GC del filestore igual que con
+        ``_file_write``.
+        """
+        Attachment = self.env["ir.attachment"].sudo()
+        vals = {"mimetype": XLSX_MIMETYPE}
+
+        if not isinstance(target, str):
+            vals["raw"] = target.getvalue()
+            return vals
+
+        try:
+            if Attachment._storage() != "file":
+                with open(target, "rb") as fh:
+                    vals["raw"] = fh.read()
+                return vals
+
+            sha = hashlib.sha1()
+            size = 0
+            with open(target, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    sha.update(chunk)
+                    size += len(chunk)
+            checksum = sha.hexdigest()
+
+            # Misma ruta que ir.attachment._get_path
+            fname = f"{checksum[:2]}/{checksum}"
+            full_path = Attachment._full_path(fname)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                shutil.move(target, full_path)
+            # Como en _file_write: si la transacción se revierte, _gc_file_store lo recoge
+            Attachment._mark_for_gc(fname)
+
+            vals.update({"store_fname": fname, "file_size": size, "checksum": checksum})
+            return vals
+        finally:
+            if os.path.exists(target):
+                os.unlink(target)
+
+    def _gd_store_file(self, target, filename):
+        """Guarda el resultado de ``_gd_new_workbook`` como ir.attachment del wizard."""
+        self.ensure_one()
+        with self._gd_stage("encoding"):
+            vals = self._gd_attachment_vals(target)
+            vals.update({
+                "name": filename,
+                "res_model": self._name,
+                "res_id": 0,
+            })
+            attachment = self.env["ir.attachment"].create(vals)
+            self.write({"gd_attachment_id": attachment.id})
+        return attachment
+
+    def _gd_download_action(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/grupodirecto/report/{self.gd_attachment_id.id}",
+            "target": "self",
+        }
+
+    # -------------------------
+    # Limpieza
+    # -------------------------
+    @api.model
+    def _gd_cron_gc_report_files(self):
+        """Borra los archivos generados más antiguos que la retención configurada
+        y aplica la expulsión de la caché de resultados."""
+        ICP = self.env["ir.config_parameter"].sudo()
+        try:
+            days = int(ICP.get_param(REPORT_FILE_RETENTION_PARAM, REPORT_FILE_RETENTION_DEFAULT))
+        except (TypeError, ValueError):
+            days = REPORT_FILE_RETENTION_DEFAULT
+        if days > 0:
+            limit = fields.Datetime.now() - timedelta(days=days)
+            old = self.env["ir.attachment"].sudo().search([
+                ("res_model", "in", list(self._gd_report_models())),
+                ("res_id", "=", 0),
+                ("res_field", "=", False),
+                ("create_date", "<", limit),
+            ])
+            if old:
+                _logger.info("[GD_XLSX] borrando %s archivos de reporte vencidos", len(old))
+                old.unlink()
+
+        self.env["gd.report.cache"].sudo()._gd_evict()
@@ -1,12 +1,11 @@
 # -*- coding: utf-8 -*-
-import base64
-import io
+import itertools
 import logging
 from datetime import datetime, time, timedelta
 
 import pytz
 
-from odoo import api, fields, models, _
+from odoo import fields, models, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
@@ -16,10 +15,14 @@ try:
 except ImportError:
     xlsxwriter = None
 
+MOVE_LINE_CHUNK_PARAM = "grupodirecto.move_line_chunk_size"
+
 
 class GdResumenInventarioWizard(models.TransientModel):
     _name = "gd.resumen.inventario.wizard"
+    _inherit = "gd.report.wizard.mixin"
     _description = "Reporte 3 - Resumen de Inventario por Proveedor (Excel)"
+    _gd_watermark_tables = ("stock_move_line",)
 
     company_id = fields.Many2one(
         "res.company",
@@ -28,48 +31,38 @@ class GdResumenInventarioWizard(models.TransientModel):
         default=lambda self: self.env.company,
     )
 
+    # Solo proveedores presentes en product.supplierinfo de la compañía
     supplier_id = fields.Many2one(
         "res.partner",
         string="Proveedor",
         required=True,
+        domain="[('gd_supplier_company_id', '=', company_id)]",
     )
 
     date_from = fields.Date(string="Desde", required=True)
     date_to = fields.Date(string="Hasta", required=True)
 
-    archivo = fields.Binary(string="Archivo", readonly=True)
-    archivo_nombre = fields.Char(string="Nombre archivo", readonly=True)
-
-    # -------------------------
-    # Helpers read_group (tolerante a variantes de keys)
-    # -------------------------
-    @staticmethod
-    def _rg_sum(group_dict, field_name):
-        """Tolera variantes de keys en read_group entre builds."""
-        for k in (f"{field_name}_sum", field_name):
-            if k in group_dict:
-                return float(group_dict.get(k) or 0.0)
-        for k in group_dict.keys():
-            if k.startswith(field_name) and k.endswith("_sum"):
-                return float(group_dict.get(k) or 0.0)
-        return 0.0
-
-    # -------------------------
-    # Dominio de proveedores (IGUAL QUE REPORTE 2): desde product.supplierinfo
-    # -------------------------
-    def _get_available_suppliers_domain(self):
-        self.ensure_one()
-        supplierinfos = self.env["product.supplierinfo"].sudo().search([
-            ("company_id", "in", [False, self.company_id.id]),
-            ("partner_id.active", "=", True),
-        ])
-        partner_ids = supplierinfos.mapped("partner_id").ids
-        return [("id", "in", partner_ids)]
-
-    @api.onchange("company_id")
-    def _onchange_company_id(self):
-        for w in self:
-            return {"domain": {"supplier_id": w._get_available_suppliers_domain()}}
+    def _gd_cache_watermark(self):
+        # Las columnas salen de las reglas de clasificación y el stock inicial
+        # de las fotos mensuales: un cambio en cualquiera de los dos invalida
+        watermark = super()._gd_cache_watermark()
+        self.env.cr.execute("""
+            SELECT count(*), max(write_date)
+              FROM gd_stock_move_rule
+             WHERE company_id IS NULL OR company_id = %s
+        """, [self.company_id.id])
+        rules = self.env.cr.fetchone()
+        product_ids = self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id
+        )
+        # gd_stock_snapshot no tiene write_date: una foto rehecha cambia sus cantidades
+        self.env.cr.execute("""
+            SELECT count(*), sum(quantity), max(snapshot_at)
+              FROM gd_stock_snapshot
+             WHERE company_id = %s AND product_id = ANY(%s)
+        """, [self.company_id.id, list(product_ids)])
+        snapshots = self.env.cr.fetchone()
+        return f"{watermark};rules={rules[0]}/{rules[1] or ''};snap={'/'.join(str(v or '') for v in snapshots)}"
 
     # -------------------------
     # Validaciones
@@ -87,37 +80,19 @@ class GdResumenInventarioWizard(models.TransientModel):
     # -------------------------
     def _get_product_ids_for_supplier(self):
         self.ensure_one()
-
-        supplierinfos = self.env["product.supplierinfo"].sudo().search([
-            ("partner_id", "=", self.supplier_id.id),
-            ("company_id", "in", [False, self.company_id.id]),
-        ])
-
-        product_ids = set()
-
-        # 1) supplierinfo a nivel variante
-        for si in supplierinfos.filtered(lambda s: s.product_id):
-            product_ids.add(si.product_id.id)
-
-        # 2) supplierinfo a nivel plantilla => todas las variantes
-        tmpl_ids = supplierinfos.filtered(lambda s: not s.product_id).mapped("product_tmpl_id").ids
-        if tmpl_ids:
-            variants = self.env["product.product"].sudo().search([
-                ("product_tmpl_id", "in", tmpl_ids),
-                ("active", "=", True),
-            ])
-            product_ids.update(variants.ids)
+        product_ids = self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id
+        )
+        if not product_ids:
+            return []
 
         # Filtrar solo stockeables/consumibles (evita servicios)
-        if product_ids:
-            Product = self.env["product.product"].sudo()
-            type_field = "detailed_type" if "detailed_type" in Product._fields else "type"
-            prods = Product.browse(list(product_ids)).filtered(
-                lambda p: getattr(p, type_field) in ("product", "consu")
-            )
-            return prods.ids
-
-        return []
+        Product = self.env["product.product"].sudo().with_context(active_test=False)
+        type_field = "detailed_type" if "detailed_type" in Product._fields else "type"
+        return Product.search([
+            ("id", "in", product_ids),
+            (type_field, "in", ("product", "consu")),
+        ]).ids
 
     def _get_products_for_supplier(self):
         product_ids = self._get_product_ids_for_supplier()
@@ -172,62 +147,89 @@ class GdResumenInventarioWizard(models.TransientModel):
             return fname
         return None
 
-    def _sum_moves(self, products, dt_from_utc, dt_to_utc, src_usage, dest_usage):
-        """Devuelve dict product_id -> qty (movimientos DONE por uso de ubicaciones)."""
+    def _get_move_groups(self, products, dt_from_utc, dt_to_utc):
+        """Movimientos DONE del rango agrupados por
+        (product_id, location_id, location_dest_id, picking_type_id) -> qty.
+        """
         self.ensure_one()
         if not products:
-            return {}
+            return []
 
-        MoveLine = self.env["stock.move.line"].sudo()
+        # 1) Camino rápido: una sola agregación SQL sobre un campo store
+        qty_field_store = self._get_move_line_qty_field(require_store=True)
+        if qty_field_store:
+            self.env["stock.move.line"].flush_model()
+            self.env.cr.execute(f"""
+                SELECT ml.product_id, ml.location_id, ml.location_dest_id, m.picking_type_id,
+                       SUM(ml.{qty_field_store})
+                  FROM stock_move_line ml
+             LEFT JOIN stock_move m ON m.id = ml.move_id
+                 WHERE ml.state = 'done'
+                   AND ml.company_id = %s
+                   AND ml.product_id = ANY(%s)
+                   AND ml.date >= %s
+                   AND ml.date <= %s
+                 GROUP BY ml.product_id, ml.location_id, ml.location_dest_id, m.picking_type_id
+            """, [
+                self.company_id.id, products.ids,
+                fields.Datetime.to_string(dt_from_utc), fields.Datetime.to_string(dt_to_utc),
+            ])
+            return [(pid, src, dest, ptype, float(qty or 0.0)) for pid, src, dest, ptype, qty in self.env.cr.fetchall()]
+
+        # 2) Fallback: sin campo store, se recorre por lotes (keyset por id) leyendo
+        #    el campo calculado en bloque; la caché se libera en cada lote.
+        qty_field_any = self._get_move_line_qty_field(require_store=False) or "qty_done"
+        chunk_size = int(self.env["ir.config_parameter"].sudo().get_param(MOVE_LINE_CHUNK_PARAM, 5000))
+        _logger.warning(
+            "[GD_R3] No hay campo qty store para agrupar en stock.move.line. "
+            "Usando fallback por lotes de %s con campo=%s.",
+            chunk_size, qty_field_any,
+        )
 
+        MoveLine = self.env["stock.move.line"].sudo()
         domain = [
             ("state", "=", "done"),
             ("company_id", "=", self.company_id.id),
             ("product_id", "in", products.ids),
             ("date", ">=", fields.Datetime.to_string(dt_from_utc)),
             ("date", "<=", fields.Datetime.to_string(dt_to_utc)),
-            ("location_id.usage", "=", src_usage),
-            ("location_dest_id.usage", "=", dest_usage),
         ]
-
-        # 1) Camino rápido: read_group con un campo store
-        qty_field_store = self._get_move_line_qty_field(require_store=True)
-        if qty_field_store:
-            groups = MoveLine.read_group(
-                domain,
-                [f"{qty_field_store}:sum"],
-                ["product_id"],
-                lazy=False,
-            )
-            res = {}
-            for g in groups:
-                if g.get("product_id"):
-                    pid = g["product_id"][0]
-                    res[pid] = self._rg_sum(g, qty_field_store)
-            return res
-
-        # 2) Fallback: sumar en python (si no hay campo store usable)
-        qty_field_any = self._get_move_line_qty_field(require_store=False) or "qty_done"
-        _logger.warning(
-            "[GD_R3] No hay campo qty store para read_group en stock.move.line. "
-            "Usando fallback python con campo=%s (puede ser más lento).",
-            qty_field_any,
-        )
-
         res = {}
-        for ml in MoveLine.search(domain):
-            pid = ml.product_id.id
-            qty = float(getattr(ml, qty_field_any, 0.0) or 0.0)
-            res[pid] = res.get(pid, 0.0) + qty
-        return res
+        last_id = 0
+        while True:
+            chunk = MoveLine.search(domain + [("id", ">", last_id)], order="id", limit=chunk_size)
+            if not chunk:
+                break
+            picking_types = {
+                m["id"]: m["picking_type_id"] and m["picking_type_id"][0]
+                for m in chunk.move_id.read(["picking_type_id"])
+            }
+            for vals in chunk.read([qty_field_any, "product_id", "location_id", "location_dest_id", "move_id"]):
+                key = (
+                    vals["product_id"] and vals["product_id"][0],
+                    vals["location_id"] and vals["location_id"][0],
+                    vals["location_dest_id"] and vals["location_dest_id"][0],
+                    picking_types.get(vals["move_id"] and vals["move_id"][0]) or None,
+                )
+                res[key] = res.get(key, 0.0) + float(vals.get(qty_field_any) or 0.0)
+            last_id = chunk.ids[-1]
+            self.env.invalidate_all()
+        return [key + (qty,) for key, qty in res.items()]
+
+    def _classify_moves(self, products, dt_from_utc, dt_to_utc):
+        """Devuelve dict columna -> {product_id: qty} según las reglas gd.stock.move.rule."""
+        self.ensure_one()
+        rules = self.env["gd.stock.move.rule"]._gd_get_rules(self.company_id.id)
+        return rules._gd_classify(self._get_move_groups(products, dt_from_utc, dt_to_utc))
 
     # -------------------------
     # Excel (maqueta del archivo que me pasaste)
     # -------------------------
-    def _build_xlsx(self, lines):
+    def _build_xlsx(self, lines, estimated_rows=0):
+        """``lines`` puede ser un generador: las filas se escriben en orden a medida
+        que llegan (requisito del modo constant_memory)."""
         self.ensure_one()
-        output = io.BytesIO()
-        wb = xlsxwriter.Workbook(output, {"in_memory": True})
+        wb, target = self._gd_new_workbook(estimated_rows)
         ws = wb.add_worksheet("Movimientos de Inventario")
 
         # Column widths (según tu Excel)
@@ -301,8 +303,10 @@ class GdResumenInventarioWizard(models.TransientModel):
 
         # Data rows start at Excel row 9 => index 8
         start_row = 8
+        count = 0
         for i, line in enumerate(lines):
             r = start_row + i
+            count += 1
             ws.set_row(r, 16.5)
 
             ws.write(r, 0, line["articulo"], fmt_base)
@@ -315,15 +319,19 @@ class GdResumenInventarioWizard(models.TransientModel):
             ws.write_number(r, 6, line["devoluciones"], fmt_num)
             ws.write_number(r, 7, line["ventas"], fmt_num)
 
-            # SALIDA COJINES: aún sin regla -> queda en blanco
-            ws.write(r, 8, "", fmt_base)
+            # SALIDA COJINES: en blanco si no hay regla configurada
+            if line.get("cojines") is None:
+                ws.write(r, 8, "", fmt_base)
+            else:
+                ws.write_number(r, 8, line["cojines"], fmt_num)
 
             # STOCK FINAL: =E - H - I + G + F  (idéntico a tu plantilla)
             excel_row = r + 1
             ws.write_formula(r, 9, f"=E{excel_row}-H{excel_row}-I{excel_row}+G{excel_row}+F{excel_row}", fmt_num)
 
         # Blank row (como tu template)
-        blank_row = start_row + len(lines)
+        blank_row = start_row + count
+        self._gd_run_rows(count)
         ws.set_row(blank_row, 5.25)
 
         # Totals row
@@ -342,73 +350,74 @@ class GdResumenInventarioWizard(models.TransientModel):
         ws.write_formula(total_row, 9, f"=SUM(J{first}:J{last})", fmt_num)
 
         wb.close()
-        output.seek(0)
-        return output.getvalue()
+        return target
 
     # -------------------------
     # Acción principal
     # -------------------------
-    def action_download_excel(self):
+    def _gd_generate_report(self):
+        """Genera el Excel y lo deja en gd_attachment_id."""
         self.ensure_one()
         self._validate_params()
 
-        products = self._get_products_for_supplier()
+        with self._gd_stage("suppliers"):
+            products = self._get_products_for_supplier()
         if not products:
             raise UserError(_("No se encontraron productos vinculados a este proveedor en la pestaña Compras."))
 
         dt_from_utc, dt_to_utc, dt_open_utc = self._get_utc_range()
 
-        compras = self._sum_moves(products, dt_from_utc, dt_to_utc, src_usage="supplier", dest_usage="internal")
-        devoluciones = self._sum_moves(products, dt_from_utc, dt_to_utc, src_usage="customer", dest_usage="internal")
-        ventas = self._sum_moves(products, dt_from_utc, dt_to_utc, src_usage="internal", dest_usage="customer")
-
-        # Stock inicial (histórico)
-        stock_inicial = {}
-        to_date = fields.Datetime.to_string(dt_open_utc)
-        prods_to_date = products.with_context(
-            to_date=to_date,
-            company_id=self.company_id.id,
-            allowed_company_ids=[self.company_id.id],
-        )
-        for p in prods_to_date:
-            stock_inicial[p.id] = float(p.qty_available or 0.0)
-
-        lines = []
-        for p in products:
-            ini = float(stock_inicial.get(p.id, 0.0) or 0.0)
-            com = float(compras.get(p.id, 0.0) or 0.0)
-            dev = float(devoluciones.get(p.id, 0.0) or 0.0)
-            ven = float(ventas.get(p.id, 0.0) or 0.0)
-
-            # salida cojines: sin regla => lo dejamos vacío en Excel
-            if ini == 0.0 and com == 0.0 and dev == 0.0 and ven == 0.0:
-                continue
+        self._gd_report_progress(10, _("Movimientos de stock"))
+        with self._gd_stage("aggregation"):
+            buckets = self._classify_moves(products, dt_from_utc, dt_to_utc)
+        compras = buckets["compras"]
+        devoluciones = buckets["devoluciones"]
+        ventas = buckets["ventas"]
+        cojines = buckets["salida_cojines"]
+        # Sin regla de cojines la columna queda en blanco (como la plantilla)
+        has_cojines = bool(self.env["gd.stock.move.rule"]._gd_get_rules(self.company_id.id).filtered(
+            lambda r: r.bucket == "salida_cojines"
+        ))
+
+        self._gd_report_progress(50, _("Stock inicial"))
+        # Stock inicial (histórico): última foto + neto de movimientos hasta la fecha
+        with self._gd_stage("stock"):
+            stock_inicial = self.env["gd.stock.snapshot"].sudo()._get_stock_at(
+                self.company_id.id, products.ids, dt_open_utc.replace(tzinfo=None)
+            )
 
-            lines.append({
-                "articulo": p.default_code or "",
-                "descripcion": p.name or p.display_name or "",
-                "unidad": p.uom_id.name or "",
-                "stock_inicial": ini,
-                "compras": com,
-                "devoluciones": dev,
-                "ventas": ven,
-            })
-
-        if not lines:
+        def _iter_lines():
+            for p in products:
+                ini = float(stock_inicial.get(p.id, 0.0) or 0.0)
+                com = float(compras.get(p.id, 0.0) or 0.0)
+                dev = float(devoluciones.get(p.id, 0.0) or 0.0)
+                ven = float(ventas.get(p.id, 0.0) or 0.0)
+                coj = float(cojines.get(p.id, 0.0) or 0.0)
+
+                if ini == 0.0 and com == 0.0 and dev == 0.0 and ven == 0.0 and coj == 0.0:
+                    continue
+
+                yield {
+                    "articulo": p.default_code or "",
+                    "descripcion": p.name or p.display_name or "",
+                    "unidad": p.uom_id.name or "",
+                    "stock_inicial": ini,
+                    "compras": com,
+                    "devoluciones": dev,
+                    "ventas": ven,
+                    "cojines": coj if has_cojines else None,
+                }
+
+        self._gd_report_progress(70, _("Generando Excel"))
+        lines = _iter_lines()
+        first_line = next(lines, None)
+        if first_line is None:
             raise UserError(_("No hay movimientos/existencias en el rango para este proveedor."))
 
-        xlsx_content = self._build_xlsx(lines)
+        with self._gd_stage("xlsx"):
+            target = self._build_xlsx(itertools.chain([first_line], lines), estimated_rows=len(products))
 
         supplier_code = (self.supplier_id.ref or str(self.supplier_id.id) or "").strip()
         filename = f"Resumen_Inventario_{supplier_code}_{self.date_from}_{self.date_to}.xlsx"
 
-        self.write({
-            "archivo": base64.b64encode(xlsx_content),
-            "archivo_nombre": filename,
-        })
-
-        return {
-            "type": "ir.actions.act_url",
-            "url": f"/web/content/?model={self._name}&id={self.id}&field=archivo&filename_field=archivo_nombre&download=true",
-            "target": "self",
-        }
+        self._gd_store_file(target, filename)
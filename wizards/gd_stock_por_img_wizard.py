@@ -1,8 +1,7 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import fields, models, _
 from odoo.exceptions import UserError
 
-import base64
 import io
 
 try:
@@ -13,7 +12,9 @@ except ImportError:
 
 class GdStockPorColorWizard(models.TransientModel):
     _name = "gd.stock.por.img.wizard"
+    _inherit = "gd.report.wizard.mixin"
     _description = "Stock por img / Stock por Lote (por Proveedor)"
+    _gd_watermark_tables = ("stock_quant", "stock_move_line")
 
     company_id = fields.Many2one(
         "res.company",
@@ -21,35 +22,14 @@ class GdStockPorColorWizard(models.TransientModel):
         required=True,
         default=lambda self: self.env.company,
     )
+    # Solo proveedores presentes en product.supplierinfo de la compañía
     supplier_id = fields.Many2one(
         "res.partner",
         string="Proveedor",
         required=True,
+        domain="[('gd_supplier_company_id', '=', company_id)]",
     )
 
-    file_data = fields.Binary(readonly=True)
-    file_name = fields.Char(readonly=True)
-
-    def _get_available_suppliers_domain(self):
-        self.ensure_one()
-
-        supplierinfos = self.env["product.supplierinfo"].sudo().search([
-            ("company_id", "in", [False, self.company_id.id]),
-            ("partner_id.active", "=", True),
-        ])
-
-        partner_ids = supplierinfos.mapped("partner_id").ids
-        return [("id", "in", partner_ids)]
-
-
-    @api.onchange("company_id")
-    def _onchange_company_id(self):
-        for w in self:
-            return {
-                "domain": {
-                    "supplier_id": w._get_available_suppliers_domain()
-                }
-            }
 
     # ----------------------------
     # Productos por proveedor
@@ -57,28 +37,37 @@ class GdStockPorColorWizard(models.TransientModel):
     def _get_products_for_supplier(self):
         self.ensure_one()
 
-        seller_domain = [
-            ("partner_id", "=", self.supplier_id.id),
-            ("company_id", "in", [False, self.company_id.id]),
-        ]
-        sellers = self.env["product.supplierinfo"].sudo().search(seller_domain)
-
-        if not sellers:
+        product_ids = self._gd_watermark_product_ids()
+        if not product_ids:
             return self.env["product.product"]
 
-        tmpl_ids = set(sellers.mapped("product_tmpl_id").ids)
-        variant_ids = set(sellers.mapped("product_id").ids)
-
-        # Traemos variantes:
-        # - Las definidas directo en supplierinfo.product_id
-        # - Todas las variantes de las plantillas supplierinfo.product_tmpl_id
-        domain = ["|", ("id", "in", list(variant_ids)), ("product_tmpl_id", "in", list(tmpl_ids))]
-        products = self.env["product.product"].sudo().search(domain)
-
         # Odoo 18: usa is_storable para filtrar inventariable/consumible según aplique
-        products = products.filtered(lambda p: getattr(p, "is_storable", False))
+        Product = self.env["product.product"].sudo()
+        if "is_storable" not in Product._fields:
+            return Product
+        return Product.search([
+            ("id", "in", product_ids),
+            ("is_storable", "=", True),
+        ])
+
+    def _gd_watermark_product_ids(self):
+        # Como siempre en este reporte: todas las variantes de cada plantilla del
+        # proveedor, aunque el supplierinfo sea de una sola variante
+        return self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id, whole_templates=True
+        )
 
-        return products
+    def _gd_cache_watermark(self):
+        # Las miniaturas salen de la imagen del producto: su cambio también invalida
+        watermark = super()._gd_cache_watermark()
+        product_ids = self._gd_watermark_product_ids()
+        self.env.cr.execute("""
+            SELECT max(GREATEST(p.write_date, t.write_date))
+              FROM product_product p
+              JOIN product_template t ON t.id = p.product_tmpl_id
+             WHERE p.id = ANY(%s)
+        """, [list(product_ids)])
+        return f"{watermark};{self.env.cr.fetchone()[0] or ''}"
 
     # ----------------------------
     # Stock actual por lote (stock.quant)
@@ -131,55 +120,52 @@ class GdStockPorColorWizard(models.TransientModel):
     # ----------------------------
     # Imagen (debajo del código)
     # ----------------------------
-    def _prepare_image_bytesio(self, product, max_px=70):
-        """Devuelve (bio, width_px, height_px) o (None, None, None)."""
-        img_b64 = product.image_256 or product.image_128 or product.image_1920
-        if not img_b64:
-            return None, None, None
+    def _prepare_image_bytesio(self, product, max_px=70, thumbnails=None):
+        """Devuelve (bio, width_px, height_px) o (None, None, None).
 
-        try:
-            raw = base64.b64decode(img_b64)
-        except Exception:
+        ``thumbnails``: resultado de gd.image.thumbnail._get_product_thumbnails
+        ya calculado para todos los productos (si no viene, se pide solo para este).
+        """
+        if thumbnails is None:
+            thumbnails = self.env["gd.image.thumbnail"]._get_product_thumbnails(product, max_px)
+        thumb = thumbnails.get(product.id)
+        if not thumb:
             return None, None, None
-
-        # Intentamos normalizar a PNG y reducir
-        try:
-            from PIL import Image  # pillow (normalmente ya viene por Odoo)
-
-            im = Image.open(io.BytesIO(raw))
-            if im.mode not in ("RGB", "RGBA"):
-                im = im.convert("RGBA")
-            im.thumbnail((max_px, max_px))
-            bio = io.BytesIO()
-            im.save(bio, format="PNG")
-            bio.seek(0)
-            w, h = im.size
-            return bio, w, h
-        except Exception:
-            # Fallback: devolvemos bytes tal cual (si xlsxwriter los acepta)
-            bio = io.BytesIO(raw)
-            return bio, max_px, max_px
+        data, w, h = thumb
+        return io.BytesIO(data), w, h
 
     # ----------------------------
     # Generación Excel
     # ----------------------------
-    def action_download_excel(self):
+    def _gd_generate_report(self):
+        """Genera el Excel y lo deja en gd_attachment_id."""
         self.ensure_one()
 
         if not xlsxwriter:
             raise UserError(_("No está instalado xlsxwriter en el entorno."))
 
-        products = self._get_products_for_supplier()
+        with self._gd_stage("suppliers"):
+            products = self._get_products_for_supplier()
         if not products:
             raise UserError(_("No se encontraron productos para el proveedor seleccionado."))
 
-        stock_map = self._get_stock_by_lot(products)
+        self._gd_report_progress(10, _("Stock por lote"))
+        with self._gd_stage("stock"):
+            stock_map = self._get_stock_by_lot(products)
 
         # Orden de productos como se espera (por referencia interna)
         products = products.sorted(key=lambda p: (p.default_code or "", p.id))
 
-        output = io.BytesIO()
-        wb = xlsxwriter.Workbook(output, {"in_memory": True})
+        with self._gd_stage("xlsx"):
+            target, filename = self._build_xlsx(products, stock_map)
+        self._gd_run_rows(len(products))
+        self._gd_store_file(target, filename)
+
+    def _build_xlsx(self, products, stock_map):
+        """Escribe el Excel; devuelve (destino de _gd_new_workbook, nombre de archivo)."""
+        # Filas estimadas: producto + lotes extra + subtotal + separador
+        estimated_rows = sum(len(stock_map.get(p.id) or [None]) + 2 for p in products)
+        wb, target = self._gd_new_workbook(estimated_rows)
         ws = wb.add_worksheet("Stock por Color")
 
         # Column widths (según tu Excel)
@@ -271,7 +257,16 @@ class GdStockPorColorWizard(models.TransientModel):
         grand_total = 0.0
         PRODUCT_ROW_HEIGHT = 100
 
-        for p in products:
+        # Miniaturas: caché por checksum y, las que faltan, en un pool de hilos
+        # que va por delante de este loop (los productos llegan en orden)
+        thumbnails_iter = self._gd_timed_iter(
+            self.env["gd.image.thumbnail"]._iter_product_thumbnails(products, 70), "images"
+        )
+
+        progress_step = max(len(products) // 20, 1)
+        for idx, (p, thumb) in enumerate(thumbnails_iter):
+            if idx % progress_step == 0:
+                self._gd_report_progress(10 + 85 * idx / len(products), _("Imágenes y filas"))
             lots = stock_map.get(p.id, [])
             if not lots:
                 # Si no hay lotes, ponemos una línea sin lote con stock 0 (o podrías sumar quants sin lote)
@@ -285,7 +280,7 @@ class GdStockPorColorWizard(models.TransientModel):
             item_no += 1
             first_lot, first_qty = lots[0]
 
-            img_bio, img_w, img_h = self._prepare_image_bytesio(p, max_px=70)
+            img_bio, img_w, img_h = self._prepare_image_bytesio(p, max_px=70, thumbnails={p.id: thumb})
             ws.set_row(row, PRODUCT_ROW_HEIGHT)
 
 
@@ -330,17 +325,6 @@ class GdStockPorColorWizard(models.TransientModel):
         ws.write_number(row, 6, float(grand_total), fmt_total_qty)
 
         wb.close()
-        output.seek(0)
 
         filename = f"Stock_por_img_{supplier_name}_{date_str.replace('/','-')}.xlsx"
-        self.write({
-            "file_name": filename,
-            "file_data": base64.b64encode(output.getvalue()),
-        })
-
-        return {
-            "type": "ir.actions.act_url",
-            "url": f"/web/content/?model={self._name}&id={self.id}"
-                   f"&field=file_data&filename_field=file_name&download=true",
-            "target": "self",
-        }
+        return target, filename
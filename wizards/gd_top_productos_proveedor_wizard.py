@@ -1,10 +1,8 @@
 # -*- coding: utf-8 -*-
-import base64
-import io
 from datetime import datetime
 import logging
 
-from odoo import api, fields, models, _
+from odoo import fields, models, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
@@ -17,7 +15,9 @@ except ImportError:
 
 class GdTopProductosProveedorWizard(models.TransientModel):
     _name = "gd.top.productos.proveedor.wizard"
+    _inherit = "gd.report.wizard.mixin"
     _description = "Artículos más/menos vendidos por proveedor (Excel)"
+    _gd_watermark_tables = ("account_move_line",)
 
     company_id = fields.Many2one(
         "res.company",
@@ -26,10 +26,12 @@ class GdTopProductosProveedorWizard(models.TransientModel):
         required=True,
     )
 
+    # Solo proveedores presentes en product.supplierinfo de la compañía
     supplier_id = fields.Many2one(
         "res.partner",
         string="Proveedor",
         required=True,
+        domain="[('gd_supplier_company_id', '=', company_id)]",
     )
 
     date_from = fields.Date(string="Fecha inicio", required=True)
@@ -47,100 +49,21 @@ class GdTopProductosProveedorWizard(models.TransientModel):
         required=True,
     )
 
-    archivo = fields.Binary(string="Archivo", readonly=True)
-    archivo_nombre = fields.Char(string="Nombre archivo", readonly=True)
-
-    # -------------------------
-    # Proveedores disponibles (desde supplierinfo)
-    # -------------------------
-    def _get_available_suppliers_domain(self):
-        """Devuelve dominio para mostrar SOLO proveedores presentes en product.supplierinfo."""
-        self.ensure_one()
-        supplierinfos = self.env["product.supplierinfo"].sudo().search([
-            ("company_id", "in", [False, self.company_id.id]),
-            ("partner_id.active", "=", True),
-        ])
-        partner_ids = supplierinfos.mapped("partner_id").ids
-        _logger.info("[GD_REPORT] Available suppliers from supplierinfo (company=%s): %s",
-                     self.company_id.id, partner_ids)
-        return [("id", "in", partner_ids)]
-
-    @api.onchange("company_id")
-    def _onchange_company_id(self):
-        """Al cambiar compañía, filtra proveedores disponibles desde supplierinfo."""
-        for w in self:
-            return {"domain": {"supplier_id": w._get_available_suppliers_domain()}}
-
-    # -------------------------
-    # Helpers read_group (Odoo cambia nombres de keys)
-    # -------------------------
-    @staticmethod
-    def _rg_sum(group_dict, field_name):
-        """Obtiene el valor sumado de read_group de forma tolerante a versiones.
-        Soporta keys tipo: quantity_sum / quantity, price_subtotal_sum / price_subtotal, etc.
-        """
-        # intentos directos
-        for k in (f"{field_name}_sum", field_name):
-            if k in group_dict:
-                val = group_dict.get(k)
-                return float(val or 0.0)
-        # fallback: cualquier key que termine en _sum y empiece con el field
-        for k in group_dict.keys():
-            if k.startswith(field_name) and k.endswith("_sum"):
-                return float(group_dict.get(k) or 0.0)
-        return 0.0
-
-    # -------------------------
-    # Debug (temporal)
-    # -------------------------
-    def _debug_dump_moves_for_products(self, product_ids):
-        """Debug forense: ORM vs SQL y muestra ejemplos reales."""
-        self.ensure_one()
-        product_ids = list(map(int, product_ids or []))
-
-        _logger.info(
-            "[GD_DEBUG] db=%s uid=%s company=%s allowed_company_ids=%s product_ids=%s",
-            self.env.cr.dbname,
-            self.env.uid,
-            self.company_id.id,
-            self.env.context.get("allowed_company_ids"),
-            product_ids,
-        )
-
-        aml_model = self.env["account.move.line"].sudo()
-
-        c1 = aml_model.search_count([("product_id", "in", product_ids)])
-        _logger.info("[GD_DEBUG] ORM count product_id in list: %s", c1)
+    only_in_stock = fields.Boolean(
+        string="Solo con existencias",
+        help="En 'Menos vendido' considera solo los productos con stock disponible.",
+    )
 
-       
-        c_ok = aml_model.search_count([
-            ("product_id", "in", product_ids),
-            ("display_type", "=", "product"),
-        ])
-        _logger.info("[GD_DEBUG] ORM count display_type='product': %s", c_ok)
 
-        sample = aml_model.search(
-            [
-                ("product_id", "in", product_ids),
-                ("display_type", "=", "product"),
-            ],
-            limit=15
+    def _gd_cache_watermark(self):
+        # "Solo con existencias" filtra por stock_quant: sus cambios también invalidan
+        watermark = super()._gd_cache_watermark()
+        if self.order_mode != "bottom" or not self.only_in_stock:
+            return watermark
+        product_ids = self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id
         )
-        for line in sample:
-            m = line.move_id
-            _logger.info(
-                "[GD_DEBUG] SAMPLE aml_id=%s move=%s(%s) type=%s state=%s date=%s invoice_date=%s product_id=%s qty=%s display_type=%s",
-                line.id, m.name, m.id, m.move_type, m.state, m.date, m.invoice_date,
-                line.product_id.id, line.quantity, line.display_type,
-            )
-
-        if product_ids:
-            self.env.cr.execute(
-                "SELECT id, product_id, move_id FROM account_move_line WHERE product_id IN %s LIMIT 30",
-                [tuple(product_ids)]
-            )
-            rows = self.env.cr.fetchall()
-            _logger.info("[GD_DEBUG] SQL rows=%s sample=%s", len(rows), rows[:10])
+        return f"{watermark};{self.env['gd.report.cache']._gd_product_watermark('stock_quant', product_ids)}"
 
     # -------------------------
     # Validaciones
@@ -161,36 +84,9 @@ class GdTopProductosProveedorWizard(models.TransientModel):
     # -------------------------
     def _get_product_ids_for_supplier(self):
         self.ensure_one()
-
-        supplierinfos = self.env["product.supplierinfo"].sudo().search([
-            ("partner_id", "=", self.supplier_id.id),
-            ("company_id", "in", [False, self.company_id.id]),
-        ])
-
-        _logger.info("[GD_REPORT] supplierinfo found: %s", len(supplierinfos))
-
-        product_ids = set()
-
-        # 1) Supplierinfo a nivel VARIANTE
-        variant_supplierinfos = supplierinfos.filtered(lambda s: s.product_id)
-        for si in variant_supplierinfos:
-            product_ids.add(si.product_id.id)
-        _logger.info("[GD_REPORT] supplierinfo with product_id (variant-level): %s", len(variant_supplierinfos))
-
-        # 2) Supplierinfo a nivel TEMPLATE 
-        template_supplierinfos = supplierinfos.filtered(lambda s: not s.product_id)
-        tmpl_ids = template_supplierinfos.mapped("product_tmpl_id").ids
-        _logger.info("[GD_REPORT] supplierinfo template-level: %s (templates=%s)", len(template_supplierinfos), tmpl_ids)
-
-        if tmpl_ids:
-            variants = self.env["product.product"].sudo().search([
-                ("product_tmpl_id", "in", tmpl_ids),
-                ("active", "=", True),
-            ])
-            product_ids.update(variants.ids)
-
-        _logger.info("[GD_REPORT] FINAL resolved product_ids: %s", list(product_ids))
-        return list(product_ids)
+        return self.env["gd.supplier.product.resolver"]._get_product_ids(
+            self.company_id.id, self.supplier_id.id
+        )
 
     # -------------------------
     # Facturas -> agregar por producto (ventas cliente)
@@ -205,78 +101,19 @@ class GdTopProductosProveedorWizard(models.TransientModel):
         if not product_ids:
             return []
 
-        aml = self.env["account.move.line"].sudo()
-
-        
-        base_domain = [
-            ("product_id", "in", product_ids),
-            ("display_type", "=", "product"),
-            ("move_id.company_id", "=", self.company_id.id),
-            ("move_id.state", "=", "posted"),
-            ("move_id.date", ">=", self.date_from),
-            ("move_id.date", "<=", self.date_to),
-        ]
-
-        inv_domain = base_domain + [("move_id.move_type", "=", "out_invoice")]
-        ref_domain = base_domain + [("move_id.move_type", "=", "out_refund")]
-
-        _logger.info("[GD_REPORT] Sales domain (out_invoice): %s", inv_domain)
-        _logger.info("[GD_REPORT] Refund domain (out_refund): %s", ref_domain)
-        _logger.info("[GD_REPORT] product_ids filter size: %s", len(product_ids))
-
-        inv_groups = aml.read_group(
-            inv_domain,
-            ["product_id", "quantity:sum", "price_subtotal:sum"],
-            ["product_id"],
-            lazy=False,
-        )
-        ref_groups = aml.read_group(
-            ref_domain,
-            ["product_id", "quantity:sum", "price_subtotal:sum"],
-            ["product_id"],
-            lazy=False,
+        # Ranking por cantidad (más/menos vendido), desempate por monto; el
+        # orden y el corte a limit_products se hacen en la base de datos.
+        # "Menos vendido" incluye los productos del proveedor sin ventas (0).
+        bottom = self.order_mode == "bottom"
+        ranked = self.env["gd.sales.aggregator"]._get_ranked_net_sales(
+            self.company_id.id, product_ids, self.date_from, self.date_to,
+            self.limit_products, descending=not bottom,
+            include_unsold=bottom, only_in_stock=bottom and self.only_in_stock,
         )
-
-        _logger.info("[GD_REPORT] out_invoice groups: %s", len(inv_groups))
-        _logger.info("[GD_REPORT] out_refund groups: %s", len(ref_groups))
-        _logger.info("[GD_DEBUG] inv_groups sample: %s", inv_groups[:5])
-
-        by_product = {}
-
-        # Ventas
-        for g in inv_groups:
-            pid = g["product_id"][0]
-            qty = self._rg_sum(g, "quantity")
-            amt = self._rg_sum(g, "price_subtotal")
-            by_product[pid] = {"product_id": pid, "qty": qty, "amount": amt}
-
-        # Devoluciones (neteo)
-        for g in ref_groups:
-            pid = g["product_id"][0]
-            qty = self._rg_sum(g, "quantity")
-            amt = self._rg_sum(g, "price_subtotal")
-
-            if pid not in by_product:
-                by_product[pid] = {"product_id": pid, "qty": 0.0, "amount": 0.0}
-
-            # Si refund ya viene negativo, se suma; si viene positivo, se resta.
-            if qty < 0 or amt < 0:
-                by_product[pid]["qty"] += qty
-                by_product[pid]["amount"] += amt
-            else:
-                by_product[pid]["qty"] -= qty
-                by_product[pid]["amount"] -= amt
-
-        rows = list(by_product.values())
-
-        # Filtrar sin movimiento neto
-        rows = [r for r in rows if (abs(r["qty"]) > 1e-9 or abs(r["amount"]) > 1e-9)]
-
-        # Ranking por cantidad (más/menos vendido)
-        reverse = (self.order_mode == "top")
-        rows.sort(key=lambda r: (r["qty"], r["amount"]), reverse=reverse)
-
-        return rows[: self.limit_products]
+        return [
+            {"product_id": pid, "qty": qty, "amount": amount}
+            for pid, qty, amount in ranked
+        ]
 
     # -------------------------
     # Excel
@@ -284,9 +121,8 @@ class GdTopProductosProveedorWizard(models.TransientModel):
     def _build_xlsx(self, rows):
         self.ensure_one()
 
-        output = io.BytesIO()
         sheet_name = "10 + Vendidos" if self.order_mode == "top" else "10 + Menos Vendidos"
-        wb = xlsxwriter.Workbook(output, {"in_memory": True})
+        wb, target = self._gd_new_workbook(len(rows))
         ws = wb.add_worksheet(sheet_name)
 
         # Columnas
@@ -418,54 +254,37 @@ class GdTopProductosProveedorWizard(models.TransientModel):
         ws.write_formula(totals_row, 5, f"=SUM(F{first_excel_row}:F{last_excel_row})", fmt_total_value)
 
         wb.close()
-        output.seek(0)
-        return output.getvalue()
+        return target
 
     # -------------------------
     # Acción principal
     # -------------------------
-    def action_download_excel(self):
+    def _gd_generate_report(self):
+        """Genera el Excel y lo deja en gd_attachment_id."""
         self.ensure_one()
         self._validate_params()
 
-        _logger.info(
-            "[GD_REPORT] Wizard run id=%s company=%s supplier_id=%s supplier=%s dates=%s..%s limit=%s order=%s",
-            self.id, self.company_id.id, self.supplier_id.id, self.supplier_id.display_name,
-            self.date_from, self.date_to, self.limit_products, self.order_mode
-        )
-
-        product_ids = self._get_product_ids_for_supplier()
-        _logger.info("[GD_REPORT] supplier->products: %s products found", len(product_ids))
-
-        if product_ids:
-            sample = self.env["product.product"].sudo().browse(product_ids[:10]).mapped("display_name")
-            _logger.info("[GD_REPORT] sample products: %s", sample)
-
+        with self._gd_stage("suppliers"):
+            product_ids = self._get_product_ids_for_supplier()
         if not product_ids:
             raise UserError(_("No se encontraron productos vinculados a este proveedor en la pestaña Compras."))
 
-        # Debug temporal
-        self._debug_dump_moves_for_products(product_ids)
-
-        rows = self._get_sales_by_product(product_ids)
-
-        _logger.info("[GD_REPORT] aggregated rows: %s", len(rows))
-        if rows:
-            _logger.info("[GD_REPORT] top rows preview: %s", rows[:10])
-
+        self._gd_report_progress(20, _("Ventas por producto"))
+        with self._gd_stage("aggregation"):
+            rows = self._get_sales_by_product(product_ids)
+        self._gd_run_rows(len(rows))
         if not rows:
             raise UserError(_("No hay movimientos en el rango de fechas para este proveedor."))
 
-        xlsx_content = self._build_xlsx(rows)
-        filename = f"Reporte_Articulos_{self.supplier_id.ref or self.supplier_id.id}_{self.date_from}_{self.date_to}.xlsx"
+        _logger.info(
+            "[GD_REPORT] wizard=%s company=%s supplier=%s dates=%s..%s order=%s: %s productos, %s filas",
+            self.id, self.company_id.id, self.supplier_id.id, self.date_from, self.date_to,
+            self.order_mode, len(product_ids), len(rows),
+        )
 
-        self.write({
-            "archivo": base64.b64encode(xlsx_content),
-            "archivo_nombre": filename,
-        })
+        self._gd_report_progress(80, _("Generando Excel"))
+        with self._gd_stage("xlsx"):
+            target = self._build_xlsx(rows)
+        filename = f"Reporte_Articulos_{self.supplier_id.ref or self.supplier_id.id}_{self.date_from}_{self.date_to}.xlsx"
 
-        return {
-            "type": "ir.actions.act_url",
-            "url": f"/web/content/?model={self._name}&id={self.id}&field=archivo&filename_field=archivo_nombre&download=true",
-            "target": "self",
-        }
+        self._gd_store_file(target, filename)